@@ -52,3 +52,10 @@ class UserSuspended(Exception):
         "en": "Your account is blocked by the administrator.",
         "ua": "Ваш обліковий запис заблоковано адміністратором."
     }
+
+
+class HashingOverloaded(Exception):
+    message = {
+        "en": "The server is busy, please try again later.",
+        "ua": "Сервер перевантажений, спробуйте пізніше."
+    }
@@ -1,7 +1,6 @@
 from fastapi import (
     APIRouter, Depends, HTTPException, 
-    status, BackgroundTasks, Response,
-    Query
+    status, Response, Query
 )
 from fastapi.responses import RedirectResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -17,7 +16,8 @@ from app.api.auth.services import (
 from app.config.database import get_async_db
 from app.api.auth.errors import (
     InvalidCredentials, CredentialsAlreadyTaken, InvalidAdminPassword,
-    UnverifiedEmail, ExpiredToken, InvalidToken, NonExistentUser
+    UnverifiedEmail, ExpiredToken, InvalidToken, NonExistentUser,
+    HashingOverloaded
 )
 from app.config.docs import user_required, user_suspended, either
 from app.config.environment import settings
@@ -47,28 +47,31 @@ async def get_me(current_user: CurrentUser = Depends(get_user)) -> UserInfo:
 @auth_router.post("/register", tags=["Registration"],
                   responses={
                       400: { "description": CredentialsAlreadyTaken.message['en'] },
-                      403: { "description": InvalidAdminPassword.message['en'] }
+                      403: { "description": InvalidAdminPassword.message['en'] },
+                      503: { "description": HashingOverloaded.message['en'] }
                   })
 async def register_user(
     user: UserCreate, 
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_async_db),
 ) -> UserInfo:
     """Register a new user."""
 
     try:
-        return await create_user(db, background_tasks, user)
+        return await create_user(db, user)
 
     except CredentialsAlreadyTaken as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except InvalidAdminPassword as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.message)
+    except HashingOverloaded as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=e.message)
 
 
 @auth_router.post("/login", tags=["Login"],
                   responses={
                       400: { "description": InvalidCredentials.message['en'] },
-                      403: { "description": UnverifiedEmail.message['en'] }
+                      403: { "description": UnverifiedEmail.message['en'] },
+                      503: { "description": HashingOverloaded.message['en'] }
                   })
 async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)) -> LoginResponse:
     """Authenticate a user and return a login response."""
@@ -79,6 +82,8 @@ async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)) -> Lo
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
     except UnverifiedEmail as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.message)
+    except HashingOverloaded as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=e.message)
 
 
 @auth_router.get("/verify", tags=["Verification"],
@@ -105,11 +110,11 @@ async def verify_email(token: str = Query(...), db: AsyncSession = Depends(get_a
 
 @auth_router.post("/resend", tags=["Verification"],
                   responses={
-                      204: { "description": "Task to send a letter initiated successfully." }
+                      204: { "description": "Letter queued (or already queued) successfully." }
                   })
-async def resend_email(email: EmailResend, background_tasks: BackgroundTasks) -> Response:
-    """Resend a letter to verify your email."""
-    await initiate_verification_task(background_tasks, email.email)
+async def resend_email(email: EmailResend, db: AsyncSession = Depends(get_async_db)) -> Response:
+    """Resend a letter to verify your email. Repeated requests for the same address are sent once."""
+    await initiate_verification_task(db, email.email)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
     
@@ -7,45 +7,44 @@ from app.api.auth.schemas import (
 )
 from app.config.models import User
 from app.api.auth.utils import (
-    verify_password, create_access_token, decode_access_token, 
-    get_user_by_email, hash_password
+    verify_password_async, create_access_token, decode_access_token, 
+    get_user_by_email, hash_password_async, user_cache,
+    invalidate_cached_user
 )
 from app.api.auth.errors import (
     InvalidCredentials, CredentialsAlreadyTaken, InvalidToken, 
     ExpiredToken, NonExistentUser, InvalidAdminPassword,
     UnverifiedEmail, UserSuspended
 )
-from app.config.database import get_async_db
+from app.config.database import get_async_db, AsyncSessionLocal
 from fastapi import (
     Depends, HTTPException, status,
-    WebSocket, BackgroundTasks
+    WebSocket
 )
 from fastapi.security import OAuth2PasswordBearer
 from loguru import logger
 from app.config.environment import settings
 from typing import Optional
-from app.config.template_storage import templates
+from app.mail.services import enqueue_email, context_providers
 from datetime import datetime
-import httpx
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
 
-async def get_current_user_ws(
-    websocket: WebSocket,
-    db: AsyncSession = Depends(get_async_db),
-) -> CurrentUser:
+async def get_current_user_ws(websocket: WebSocket) -> CurrentUser:
     token = websocket.query_params.get("token")
 
     if not token:
         return "Missing token."
 
-    try:
-        return await get_user_by_token(token, db)
-    except (ExpiredToken, InvalidToken, NonExistentUser) as e:
-        return e.message
+    # A request-scoped session would keep its pooled connection for the whole lifetime of the socket.
+    async with AsyncSessionLocal() as db:
+        try:
+            return await get_user_by_token(token, db)
+        except (ExpiredToken, InvalidToken, NonExistentUser) as e:
+            return e.message
 
 
 async def check_email(data: EmailCheck, db: AsyncSession) -> CheckResult:
@@ -94,20 +93,24 @@ async def get_user_by_token(token: str, db: AsyncSession) -> CurrentUser:
     payload = decode_access_token(token)
     email = payload.get("sub")
 
-    result = await db.execute(select(User).filter(User.email == email))
-    user = result.scalars().first()
+    async def load() -> CurrentUser:
+        result = await db.execute(select(User).filter(User.email == email))
+        user = result.scalars().first()
 
-    if not user:
-        raise NonExistentUser
-    
-    return CurrentUser.from_orm(user)
+        if not user:
+            raise NonExistentUser
+
+        return CurrentUser.from_orm(user)
+
+    # A load that read the row before a suspension committed is not cached (see TTLCache._load).
+    return await user_cache.get_or_load(email, load)
 
 
 async def try_login(db: AsyncSession, provided: UserLogin) -> LoginResponse:
     logger.debug(f"Trying to log in, user = {provided}")
     user = await get_user_by_email(db, provided.email)
 
-    if not user or not verify_password(provided.password, user.hashed_password):
+    if not user or not await verify_password_async(provided.password, user.hashed_password):
         raise InvalidCredentials
     
     if user.is_verified == False:
@@ -118,7 +121,7 @@ async def try_login(db: AsyncSession, provided: UserLogin) -> LoginResponse:
     return LoginResponse(token=access_token, user=user)
 
 
-async def create_user(db: AsyncSession, tasks: BackgroundTasks, user: UserCreate) -> UserInfo:
+async def create_user(db: AsyncSession, user: UserCreate) -> UserInfo:
     existing_user = await get_user_by_email(db, user.email)
 
     if existing_user:
@@ -136,53 +139,47 @@ async def create_user(db: AsyncSession, tasks: BackgroundTasks, user: UserCreate
         name=user.name,
         surname=user.surname,
         email=user.email,
-        hashed_password=hash_password(user.password),
+        hashed_password=await hash_password_async(user.password),
         role=role
     )
 
     db.add(db_user)
+    # The letter is queued in the same transaction, so no user is left without one.
+    await queue_verification_letter(db, user.email)
     await db.commit()
     await db.refresh(db_user)
 
-    await initiate_verification_task(tasks, user.email)
-
     return UserInfo.from_orm(db_user)
 
 
-async def initiate_verification_task(tasks: BackgroundTasks, recipient: str):
+def verification_context(recipient: str, template_args: dict) -> dict:
+    """Mints the verification token when the letter is sent, so retries never carry an expired link."""
     verification_token = create_access_token({"sub": recipient})
-    tasks.add_task(
-        send_email_async,
+    return {
+        **template_args,
+        "verification_link": settings.BACKEND_URL + f"/auth/verify?token={verification_token}",
+        "year": str(datetime.now().year),
+    }
+
+
+context_providers["verify"] = verification_context
+
+
+async def queue_verification_letter(db: AsyncSession, recipient: str):
+    """Adds the verification letter to the caller's transaction."""
+    await enqueue_email(
+        db,
         recipient=recipient,
         template_name='verify',
-        template_args={
-            "verification_link": settings.BACKEND_URL + f"/auth/verify?token={verification_token}",
-            "year": str(datetime.now().year)
-        },
-        subject="Email verification"
+        template_args={},
+        subject="Email verification",
+        dedup_key=f"verify:{recipient.lower()}"
     )
 
 
-async def send_email_async(recipient: str, template_name: str, template_args: dict, subject: str):
-    payload = {
-        "from": settings.EMAIL,
-        "to": [recipient],
-        "subject": subject,
-        "html": templates[template_name].render(**template_args)
-    }
-
-    logger.debug(f"Sending letter f'{template_name}.html' with arguments: {template_args}")
-
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                "https://www.unosend.co/api/v1/emails", 
-                headers={"Authorization": f"Bearer {settings.UNOSEND_API_KEY}"}, 
-                json=payload
-            )
-            response.raise_for_status()
-    except Exception as e:
-        logger.critical(f"Critial error while sending a letter: {str(e)}")
+async def initiate_verification_task(db: AsyncSession, recipient: str):
+    await queue_verification_letter(db, recipient)
+    await db.commit()
 
 
 async def try_verify_email(db: AsyncSession, token: str):
@@ -199,5 +196,7 @@ async def try_verify_email(db: AsyncSession, token: str):
     db.add(user)
     await db.commit()
 
+    invalidate_cached_user(email)
+
 
 
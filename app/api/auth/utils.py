@@ -1,16 +1,32 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from app.api.auth.errors import ExpiredToken, InvalidToken
+from app.api.auth.errors import ExpiredToken, InvalidToken, HashingOverloaded
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.config.models import User
 from app.config.environment import settings
+from app.shared.cache import TTLCache
 from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import time
 import jwt
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Authenticated users keyed by token subject (email).
+user_cache = TTLCache("users", maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+
+def invalidate_cached_user(email: str):
+    user_cache.invalidate(email)
+
+
+# bcrypt releases the GIL, so hashing runs in threads without blocking the event loop.
+hashing_executor = ThreadPoolExecutor(max_workers=settings.HASHING_WORKERS, thread_name_prefix="hashing")
+hashing_pending = 0
+
 
 async def get_user_by_id(db: AsyncSession, identifier: int) -> User | None:
     result = await db.execute(select(User).filter(User.id == identifier))
@@ -31,6 +47,48 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def run_hashing(func, *args):
+    global hashing_pending
+
+    if hashing_pending >= settings.HASHING_QUEUE_LIMIT:
+        raise HashingOverloaded
+
+    hashing_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(hashing_executor, func, *args)
+    finally:
+        hashing_pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_hashing(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_hashing(verify_password, plain_password, hashed_password)
+
+
+async def calibrate_hashing(rounds: int = 3) -> float:
+    def measure() -> float:
+        hashed = pwd_context.hash("calibration")
+        started = time.perf_counter()
+        for _ in range(rounds):
+            pwd_context.verify("calibration", hashed)
+        return (time.perf_counter() - started) / rounds
+
+    loop = asyncio.get_running_loop()
+    latency = await loop.run_in_executor(hashing_executor, measure)
+
+    logger.info(
+        f"bcrypt calibration: {latency * 1000:.1f} ms per hash, "
+        f"{settings.HASHING_WORKERS} workers (~{settings.HASHING_WORKERS / latency:.0f} hashes/s), "
+        f"queue limit {settings.HASHING_QUEUE_LIMIT}"
+    )
+
+    return latency
+
+
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + expires_delta
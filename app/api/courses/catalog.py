@@ -0,0 +1,253 @@
+from sqlalchemy import select
+from app.config.models import Course
+from app.config.database import AsyncSessionLocal
+from app.config.environment import settings
+from app.api.courses.schemas import (
+    CourseFilter, PaginationInfo, ProjectedPaginationInfo
+)
+from app.api.courses.utils import (
+    course_columns, course_list_adapter, pagination_adapter,
+    projected_pagination_adapter, course_write_hooks
+)
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional, List
+from loguru import logger
+import asyncio
+import bisect
+import re
+
+
+# Filter name -> columns it matches with ILIKE '%term%' (several columns are OR-ed).
+TEXT_FILTERS = {
+    "title": ("title_en", "title_ua"),
+    "description": ("description_en", "description_ua"),
+    "category": ("category",),
+    "durationText": ("durationText",),
+    "link": ("link",),
+    "speaker": ("speaker",),
+    "image": ("image",),
+}
+
+WORD = re.compile(r"\w+")
+
+# Re-read rows updated slightly before the last seen timestamp, in case a transaction
+# that started earlier committed after the previous poll.
+REFRESH_OVERLAP = timedelta(minutes=5)
+
+
+class CatalogIndex:
+    """
+    In-process copy of the course catalog answering anonymous/user `CourseFilter` queries.
+
+    Tags have an inverted index and prices a sorted index. Text filters keep `ILIKE '%term%'`
+    semantics: a term made of word characters can only occur inside a single word, so it is
+    resolved through the word index of the filter; other terms scan the candidates' text.
+    Admin queries, `isPublished`, full-text `q`, cursor pagination and terms with LIKE
+    wildcards go to the database.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.last_seen: Optional[datetime] = None
+
+        self.rows: dict[int, dict] = {}
+        self.views: dict = {}
+        self.texts: dict[str, dict[int, str]] = {name: {} for name in TEXT_FILTERS}
+        self.words: dict[str, dict[str, set[int]]] = {name: defaultdict(set) for name in TEXT_FILTERS}
+        self.tags: dict[str, set[int]] = defaultdict(set)
+        self.prices: list[tuple[float, int]] = []
+
+        self.refresh_requested = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def supports(self, tags: Optional[List[str]], parameters: CourseFilter, is_admin: bool) -> bool:
+        if not self.ready or is_admin:
+            return False
+
+        if parameters.isPublished is not None or parameters.q or parameters.after or parameters.pagination != "offset":
+            return False
+
+        return not any(
+            term and any(char in term for char in "%_\\")
+            for term in (getattr(parameters, name) for name in TEXT_FILTERS)
+        )
+
+    def add(self, row: dict, view):
+        course_id = row["id"]
+
+        self.rows[course_id] = row
+        self.views[course_id] = view
+
+        for tag in row["tags"]:
+            self.tags[tag].add(course_id)
+
+        for name, columns in TEXT_FILTERS.items():
+            # NUL never occurs in a search term, so a match cannot span two columns.
+            text = "\0".join((row[column] or "").lower() for column in columns)
+            self.texts[name][course_id] = text
+            for word in set(WORD.findall(text)):
+                self.words[name][word].add(course_id)
+
+        self.prices.append((row["price"], course_id))
+
+    def remove(self, course_id: int):
+        row = self.rows.pop(course_id, None)
+        if row is None:
+            return
+
+        del self.views[course_id]
+
+        for tag in row["tags"]:
+            self.tags[tag].discard(course_id)
+            if not self.tags[tag]:
+                del self.tags[tag]
+
+        for name in TEXT_FILTERS:
+            text = self.texts[name].pop(course_id)
+            for word in set(WORD.findall(text)):
+                self.words[name][word].discard(course_id)
+                if not self.words[name][word]:
+                    del self.words[name][word]
+
+        index = bisect.bisect_left(self.prices, (row["price"], course_id))
+        del self.prices[index]
+
+    def apply(self, rows: list[dict]):
+        views = course_list_adapter.validate_python(rows)
+
+        # Removals bisect the price index, so they all happen while it is still sorted.
+        for row in rows:
+            self.remove(row["id"])
+
+        for row, view in zip(rows, views):
+            self.add(row, view)
+
+            if self.last_seen is None or row["updatedAt"] > self.last_seen:
+                self.last_seen = row["updatedAt"]
+
+        # One sort per batch; an insort per row made loading the catalog quadratic.
+        self.prices.sort()
+
+    def match_text(self, name: str, term: str, candidates: Optional[set[int]]) -> set[int]:
+        term = term.lower()
+
+        if WORD.fullmatch(term):
+            return set().union(*[ids for word, ids in self.words[name].items() if term in word])
+
+        texts = self.texts[name]
+        return {course_id for course_id in (candidates if candidates is not None else texts) if term in texts[course_id]}
+
+    def search(self, tags: Optional[List[str]], parameters: CourseFilter) -> list[int]:
+        candidates: Optional[set[int]] = None
+
+        def narrow(ids: set[int]):
+            nonlocal candidates
+            candidates = ids if candidates is None else candidates & ids
+
+        if tags:
+            tag_sets = [self.tags.get(tag.lower(), set()) for tag in tags]
+            narrow(set.intersection(*tag_sets) if parameters.tags_mode == "all" else set.union(*tag_sets))
+
+        # Same truthiness as build_course_filters: a zero bound is not applied.
+        if parameters.price_min:
+            start = bisect.bisect_left(self.prices, (parameters.price_min, float("-inf")))
+            narrow({course_id for _, course_id in self.prices[start:]})
+
+        if parameters.price_max:
+            end = bisect.bisect_right(self.prices, (parameters.price_max, float("inf")))
+            narrow({course_id for _, course_id in self.prices[:end]})
+
+        for name in TEXT_FILTERS:
+            term = getattr(parameters, name)
+            if term:
+                narrow(self.match_text(name, term, candidates))
+
+        return sorted(candidates if candidates is not None else self.rows)
+
+    def query(self, tags: Optional[List[str]], parameters: CourseFilter, projection: Optional[dict]) -> bytes:
+        ids = self.search(tags, parameters)
+
+        start = (parameters.page - 1) * parameters.page_size
+        page_ids = ids[start:start + parameters.page_size]
+
+        total_courses = len(ids)
+        total_pages = (total_courses + parameters.page_size - 1) // parameters.page_size
+
+        if projection is not None:
+            page = ProjectedPaginationInfo(
+                courses=[
+                    {name: self.rows[course_id][column.key] for name, column in projection.items()}
+                    for course_id in page_ids
+                ],
+                current_page=parameters.page,
+                page_size=len(page_ids),
+                total_courses=total_courses,
+                total_pages=total_pages,
+            )
+            return projected_pagination_adapter.dump_json(page)
+
+        page = PaginationInfo(
+            courses=[self.views[course_id] for course_id in page_ids],
+            current_page=parameters.page,
+            page_size=len(page_ids),
+            total_courses=total_courses,
+            total_pages=total_pages,
+        )
+        return pagination_adapter.dump_json(page)
+
+    async def refresh(self):
+        columns = course_columns()
+        query = select(*[column.label(name) for name, column in columns.items()])
+
+        if self.last_seen is not None:
+            query = query.where(Course.updatedAt > self.last_seen - REFRESH_OVERLAP)
+
+        async with AsyncSessionLocal() as db:
+            rows = [dict(row) for row in (await db.execute(query)).mappings().all()]
+            existing = set((await db.execute(select(Course.id))).scalars().all())
+
+        for course_id in set(self.rows) - existing:
+            self.remove(course_id)
+
+        self.apply([row for row in rows if row["id"] in existing])
+
+    def request_refresh(self):
+        self.refresh_requested.set()
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.refresh_requested.wait(), timeout=settings.CATALOG_REFRESH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            self.refresh_requested.clear()
+
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Catalog refresh failed: {str(e)}")
+
+    async def start(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.critical(f"Could not load the course catalog, serving courses from the database: {str(e)}")
+            return
+
+        self.ready = True
+        course_write_hooks.append(self.request_refresh)
+        self.task = asyncio.create_task(self.run())
+
+        logger.info(f"Course catalog loaded into memory: {len(self.rows)} courses")
+
+    async def stop(self):
+        self.ready = False
+
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+
+catalog = CatalogIndex()
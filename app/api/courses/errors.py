@@ -10,3 +10,17 @@ class InsufficientFilterRights(Exception):
         "en": "You can't use this filter.",
         "ua": "Ви не можете використовувати цей фільтр."
     }
+
+
+class InvalidBulkPayload(Exception):
+    message = {
+        "en": "Bulk requests expect a JSON array or NDJSON lines.",
+        "ua": "Пакетні запити очікують JSON-масив або рядки NDJSON."
+    }
+
+
+class InvalidField(Exception):
+    message = {
+        "en": "Unknown field requested. Localized fields (title, description) require lang.",
+        "ua": "Запитано невідоме поле. Локалізовані поля (title, description) потребують lang."
+    }
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, status, Response, HTTPException, Query
+from fastapi import APIRouter, Depends, status, Response, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api.courses.schemas import (
     CourseCreate, CourseUpdate, CourseView,
-    PaginationInfo, CourseId, CourseFilter
+    PaginationInfo, CourseId, CourseFilter,
+    CourseBulkResponse, CourseBulkPatch, CourseFacets,
+    ProjectedPaginationInfo
 )
 from app.api.auth.services import (
     get_admin, get_user, get_optional_user
@@ -10,16 +12,26 @@ from app.api.auth.services import (
 from app.config.database import get_async_db
 from app.api.courses.services import (
     create_course, delete_course, patch_course,
-    try_get_course, filter_courses
+    try_get_course, filter_courses, bulk_create_courses,
+    bulk_patch_courses, bulk_delete_courses, get_course_facets,
+    export_courses, get_projected_course
 )
 from app.api.auth.schemas import CurrentUser
 from app.config.models import Course
-from app.api.courses.utils import get_course_by_id
-from app.api.courses.errors import InsufficientRights, InsufficientFilterRights
-from typing import Optional, List
+from app.api.courses.utils import (
+    get_course_by_id, iter_bulk_items, course_projection
+)
+from app.api.courses.errors import (
+    InsufficientRights, InsufficientFilterRights, InvalidBulkPayload,
+    InvalidField
+)
+from app.shared.errors import InvalidCursor
+from app.shared.utils import ExportFormat, EXPORT_MEDIA_TYPES
+from fastapi.responses import StreamingResponse
+from typing import Optional, List, Literal, Dict, Any
 from app.config.docs import (
     admin_required, user_required, privilege_required,
-    user_suspended
+    user_suspended, either
 )
 from loguru import logger
 
@@ -27,6 +39,18 @@ from loguru import logger
 course_router = APIRouter(responses={**user_suspended})
 
 
+def bulk_body(item_schema: dict) -> dict:
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": {"type": "array", "items": item_schema}},
+                "application/x-ndjson": {"schema": item_schema},
+            }
+        }
+    }
+
+
 @course_router.post("/", tags=["Courses", "Admin"],
                     responses={
                         **admin_required,
@@ -41,6 +65,72 @@ async def admin_create_course(
     return await create_course(db, course)
 
 
+@course_router.post("/bulk", tags=["Courses", "Admin"],
+                    openapi_extra=bulk_body(CourseCreate.model_json_schema()),
+                    responses={
+                        **admin_required,
+                        **privilege_required,
+                        400: { "description": InvalidBulkPayload.message['en'] }
+                    })
+async def admin_bulk_create_courses(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_admin)
+) -> CourseBulkResponse:
+    """
+    Creates many courses in one transaction and reports the result of every item.
+    Accepts a JSON array or an `application/x-ndjson` stream with one course per line.
+    """
+    try:
+        return await bulk_create_courses(db, iter_bulk_items(request))
+    except InvalidBulkPayload as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+
+@course_router.patch("/bulk", tags=["Courses", "Admin"],
+                     openapi_extra=bulk_body(CourseBulkPatch.model_json_schema()),
+                     responses={
+                         **admin_required,
+                         **privilege_required,
+                         400: { "description": InvalidBulkPayload.message['en'] }
+                     })
+async def admin_bulk_patch_courses(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_admin)
+) -> CourseBulkResponse:
+    """
+    Patches many courses (each item carries its `id`) in one transaction.
+    Accepts a JSON array or an `application/x-ndjson` stream.
+    """
+    try:
+        return await bulk_patch_courses(db, iter_bulk_items(request))
+    except InvalidBulkPayload as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+
+@course_router.delete("/bulk", tags=["Courses", "Admin"],
+                      openapi_extra=bulk_body({"type": "integer"}),
+                      responses={
+                          **admin_required,
+                          **privilege_required,
+                          400: { "description": InvalidBulkPayload.message['en'] }
+                      })
+async def admin_bulk_delete_courses(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_admin)
+) -> CourseBulkResponse:
+    """
+    Deletes many courses by ID in one transaction.
+    Accepts a JSON array of IDs or an `application/x-ndjson` stream.
+    """
+    try:
+        return await bulk_delete_courses(db, iter_bulk_items(request))
+    except InvalidBulkPayload as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+
 @course_router.delete("/{id}", tags=["Courses", "Admin"],
                       responses={
                           **admin_required,
@@ -73,46 +163,112 @@ async def admin_patch_course(
     return await patch_course(update, course, db)
 
 
+@course_router.get("/facets", tags=["Courses"],
+                   responses={
+                       403: { "description": InsufficientFilterRights.message['en'] }
+                   })
+async def get_facets(
+    tags: Optional[List[str]] = Query(None),
+    buckets: int = Query(10, ge=1, le=50),
+    parameters: CourseFilter = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[CurrentUser] = Depends(get_optional_user)
+) -> CourseFacets:
+    """
+    Returns tag counts, category counts and a price histogram (`buckets` equal-width buckets)
+    for the courses matching the same filters as `GET /courses/`. Pagination parameters are ignored.
+    """
+    try:
+        return await get_course_facets(tags, parameters, buckets, db, current_user)
+    except InsufficientFilterRights as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.message)
+
+
+@course_router.get("/export", tags=["Courses", "Admin"],
+                   response_class=StreamingResponse,
+                   responses={
+                       **admin_required,
+                       **privilege_required
+                   })
+async def admin_export_courses(
+    format: ExportFormat = "ndjson",
+    tags: Optional[List[str]] = Query(None),
+    parameters: CourseFilter = Depends(),
+    current_user: CurrentUser = Depends(get_admin)
+):
+    """
+    Streams every course matching the filters of `GET /courses/` as NDJSON or CSV.
+    Pagination parameters are ignored.
+    """
+    return StreamingResponse(
+        export_courses(tags, parameters, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="courses.{format}"'}
+    )
+
+
 @course_router.get("/{id}", tags=["Courses"],
                    responses={
                        **user_required,
+                       400: { "description": InvalidField.message['en'] },
                        403: { "description": InsufficientRights.message['en'] }
                    })
 async def get_single_course(
     id: int,
-    course: Course = Depends(get_course_by_id),
+    fields: Optional[List[str]] = Query(None),
+    lang: Optional[Literal["ua", "en"]] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: CurrentUser = Depends(get_user)
-) -> CourseView:
+) -> CourseView | Dict[str, Any]:
     """
     Retrieves a single course by ID.
     Raises HTTP 403 if insufficient rights.
+
+    `fields` and `lang` work as in `GET /courses/`; only the selected columns are read.
     """
     try:
-        return try_get_course(course, current_user)
+        if fields or lang:
+            return await get_projected_course(id, course_projection(fields, lang), db, current_user)
+
+        return try_get_course(await get_course_by_id(id, db), current_user)
     except InsufficientRights as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.message)
+    except InvalidField as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
 
 
 @course_router.get("/", tags=["Courses"],
                    responses={
                        **user_required,
+                       400: { "description": either(InvalidCursor.message['en'], InvalidField.message['en']) },
                        403: { "description": InsufficientFilterRights.message['en'] }
                    })
 async def get_multiple_courses(
     tags: Optional[List[str]] = Query(None),
+    fields: Optional[List[str]] = Query(None),
+    lang: Optional[Literal["ua", "en"]] = None,
     parameters: CourseFilter = Depends(),
     db: AsyncSession = Depends(get_async_db), 
     current_user: Optional[CurrentUser] = Depends(get_optional_user)
-) -> PaginationInfo:
+) -> PaginationInfo | ProjectedPaginationInfo:
     """
     Retrieves multiple courses with filters and pagination.
 
     To send an array of query parameters, use following syntax:
     http://127.0.0.1:8000/courses/?tags=AI for Fintech&tags=Fintech, Digital Finance %26 Virtual Assets
+
+    For deep paging use `pagination=cursor` and pass the returned `next_cursor` as `after`.
+    `count=estimate` or `count=none` skips the exact total count.
+
+    `fields=id,title,price,image` selects only those columns and returns compact course objects.
+    `lang=ua|en` exposes `title` and `description` in one language instead of both.
     """
 
     logger.debug(parameters)
     try:
-        return await filter_courses(tags, parameters, db, current_user)
+        content = await filter_courses(tags, parameters, db, current_user, fields, lang)
+        return Response(content=content, media_type="application/json")
     except InsufficientFilterRights as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=e.message)
+    except (InvalidCursor, InvalidField) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
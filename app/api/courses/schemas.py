@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field, validator, HttpUrl
-from typing import List, Optional
+from typing import List, Optional, Literal, Dict, Any
 from datetime import datetime
 from fastapi import Query
+from app.shared.utils import CountMode
 
 
 def tags_validator(tags: List[str]) -> List[str]:
@@ -76,6 +77,9 @@ class CourseUpdate(BaseModel):
     
 
 class CourseFilter(BaseModel):
+    # Full-text search over titles, descriptions, category and speaker, ranked by relevance.
+    q: Optional[str] = Field(None, min_length=1, max_length=256)
+
     title: Optional[str] = None
     description: Optional[str] = None
 
@@ -92,9 +96,17 @@ class CourseFilter(BaseModel):
     
     isPublished: Optional[bool] = None
 
+    # "any" returns courses with at least one of `tags`, "all" only courses having every tag.
+    tags_mode: Literal["any", "all"] = "any"
+
     page: int = Field(1, ge=1)
     page_size: int = Field(20, ge=1, le=100)
 
+    # Opt-in keyset pagination: pass `pagination=cursor` (or `after`) and follow `next_cursor`.
+    pagination: Literal["offset", "cursor"] = "offset"
+    after: Optional[str] = None
+    count: CountMode = "exact"
+
 
 class CourseView(CourseCreate):
     id: int
@@ -107,11 +119,54 @@ class CourseView(CourseCreate):
 
 class PaginationInfo(BaseModel):
     courses: List[CourseView]
-    current_page: int
+    current_page: Optional[int]
     page_size: int
-    total_courses: int
-    total_pages: int
+    total_courses: Optional[int]
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
+
+
+class ProjectedPaginationInfo(BaseModel):
+    courses: List[Dict[str, Any]]
+    current_page: Optional[int]
+    page_size: int
+    total_courses: Optional[int]
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
 
 class CourseId(BaseModel):
-    id: int
\ No newline at end of file
+    id: int
+
+
+class CourseBulkPatch(CourseUpdate):
+    id: int
+
+
+class CourseBulkResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    status: Literal["created", "updated", "deleted", "invalid", "not_found"]
+    errors: Optional[List[dict]] = None
+
+
+class CourseBulkResponse(BaseModel):
+    results: List[CourseBulkResult]
+    succeeded: int
+    failed: int
+
+
+
+class PriceBucket(BaseModel):
+    min: float
+    max: float
+    count: int
+
+
+class CourseFacets(BaseModel):
+    total_courses: int
+    tags: Dict[str, int]
+    categories: Dict[str, int]
+    price_min: Optional[float]
+    price_max: Optional[float]
+    price_histogram: List[PriceBucket]
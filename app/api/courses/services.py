@@ -1,22 +1,39 @@
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import insert, update, delete, func, case, literal
 from app.api.courses.schemas import (
     CourseCreate, CourseUpdate, CourseView,
-    PaginationInfo, CourseId, CourseFilter
+    PaginationInfo, CourseId, CourseFilter,
+    CourseBulkPatch, CourseBulkResult, CourseBulkResponse,
+    CourseFacets, PriceBucket, ProjectedPaginationInfo
 )
 from app.config.models import Course
 from datetime import datetime
 from app.api.auth.schemas import CurrentUser
 from app.api.courses.errors import InsufficientRights, InsufficientFilterRights
-from app.api.courses.utils import build_course_filters
-from app.shared.utils import paginate
-from typing import Optional, List
+from app.api.courses.utils import (
+    build_course_filters, course_search_rank, course_cache,
+    course_cache_key, invalidate_course_cache, validation_errors,
+    facet_cache, facet_cache_key, course_projection,
+    course_columns, course_list_adapter, pagination_adapter,
+    projected_pagination_adapter
+)
+from app.api.courses.catalog import catalog
+from app.shared.utils import paginate, paginate_keyset, stream_export, ExportFormat
+from typing import Optional, List, AsyncIterator, Any
+from pydantic import ValidationError
+import json
+
+
+BULK_BATCH_SIZE = 500
 
 
 async def create_course(db: AsyncSession, course: CourseCreate) -> CourseId:
     db_course = Course(**course.model_dump(mode="json"))
     db.add(db_course)
     await db.commit()
+    invalidate_course_cache()
     await db.refresh(db_course)
     return CourseId(id=db_course.id)
 
@@ -24,6 +41,7 @@ async def create_course(db: AsyncSession, course: CourseCreate) -> CourseId:
 async def delete_course(db: AsyncSession, course: Course):
     await db.delete(course)
     await db.commit()
+    invalidate_course_cache()
 
 
 async def patch_course(course_update: CourseUpdate, course: Course, db: AsyncSession) -> CourseView:
@@ -33,6 +51,7 @@ async def patch_course(course_update: CourseUpdate, course: Course, db: AsyncSes
     course.updatedAt = datetime.utcnow()
 
     await db.commit()
+    invalidate_course_cache()
     await db.refresh(course)
 
     return CourseView.from_orm(course)
@@ -45,32 +64,354 @@ def try_get_course(course: Course, current_user: CurrentUser) -> CourseView:
     return CourseView.from_orm(course)
 
 
+async def get_projected_course(id: int, projection: dict, db: AsyncSession, current_user: CurrentUser) -> dict:
+    """Selects only the projected columns of a course, plus `isPublished` for the access check."""
+    columns = {"isPublished": Course.isPublished, **projection}
+    result = await db.execute(
+        select(*[column.label(name) for name, column in columns.items()]).filter(Course.id == id)
+    )
+    row = result.mappings().first()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="No course with this id.")
+
+    if current_user.role != "admin" and row["isPublished"] == False:
+        raise InsufficientRights
+
+    return {name: row[name] for name in projection}
+
+
 async def filter_courses(
     tags: Optional[List[str]],
     parameters: CourseFilter,
     db: AsyncSession,
     current_user: Optional[CurrentUser],
-) -> PaginationInfo:
+    fields: Optional[List[str]] = None,
+    lang: Optional[str] = None,
+) -> bytes:
+    """Returns the page already encoded as JSON (`PaginationInfo` or `ProjectedPaginationInfo`)."""
 
-    if (current_user is None or current_user.role != "admin") and parameters.isPublished is not None:
+    is_admin = current_user is not None and current_user.role == "admin"
+
+    if not is_admin and parameters.isPublished is not None:
         raise InsufficientFilterRights
 
-    filters = build_course_filters(tags, parameters)
+    projection = course_projection(fields, lang) if fields or lang else None
+
+    if catalog.supports(tags, parameters, is_admin):
+        return catalog.query(tags, parameters, projection)
 
-    base_query = select(Course).filter(*filters)
+    return await course_cache.get_or_load(
+        course_cache_key(tags, parameters, is_admin, projection),
+        lambda: query_courses(tags, parameters, db, projection)
+    )
+
+
+async def get_course_facets(
+    tags: Optional[List[str]],
+    parameters: CourseFilter,
+    buckets: int,
+    db: AsyncSession,
+    current_user: Optional[CurrentUser],
+) -> CourseFacets:
 
-    courses, total_courses, total_pages = await paginate(
-        db=db,
-        base_query=base_query,
-        page=parameters.page,
-        page_size=parameters.page_size,
+    is_admin = current_user is not None and current_user.role == "admin"
+
+    if not is_admin and parameters.isPublished is not None:
+        raise InsufficientFilterRights
+
+    return await facet_cache.get_or_load(
+        facet_cache_key(tags, parameters, is_admin, buckets),
+        lambda: query_course_facets(tags, parameters, buckets, db)
     )
 
-    return PaginationInfo(
-        courses=[CourseView.from_orm(course) for course in courses],
-        current_page=parameters.page,
+
+async def query_course_facets(
+    tags: Optional[List[str]],
+    parameters: CourseFilter,
+    buckets: int,
+    db: AsyncSession,
+) -> CourseFacets:
+
+    filtered = (
+        select(Course.tags, Course.category, Course.price)
+        .filter(*build_course_filters(tags, parameters))
+        .cte("filtered")
+    )
+
+    unnested = select(func.unnest(filtered.c.tags).label("tag")).subquery()
+    tag_counts = select(unnested.c.tag, func.count().label("n")).group_by(unnested.c.tag).subquery()
+
+    category_counts = (
+        select(filtered.c.category, func.count().label("n"))
+        .group_by(filtered.c.category)
+        .subquery()
+    )
+
+    bounds = select(
+        func.min(filtered.c.price).label("lo"),
+        func.max(filtered.c.price).label("hi")
+    ).subquery()
+
+    bucket = case(
+        (bounds.c.hi == bounds.c.lo, 1),
+        else_=func.least(func.width_bucket(filtered.c.price, bounds.c.lo, bounds.c.hi, buckets), buckets)
+    ).label("bucket")
+    histogram = select(bucket, func.count().label("n")).select_from(filtered).join(bounds, literal(True)).group_by(bucket).subquery()
+
+    query = select(
+        select(func.count()).select_from(filtered).scalar_subquery().label("total"),
+        select(func.json_object_agg(tag_counts.c.tag, tag_counts.c.n)).scalar_subquery().label("tags"),
+        select(func.json_object_agg(category_counts.c.category, category_counts.c.n)).scalar_subquery().label("categories"),
+        select(bounds.c.lo).scalar_subquery().label("lo"),
+        select(bounds.c.hi).scalar_subquery().label("hi"),
+        select(func.json_object_agg(histogram.c.bucket, histogram.c.n)).scalar_subquery().label("histogram"),
+    )
+
+    row = (await db.execute(query)).one()
+
+    def load(value) -> dict:
+        if value is None:
+            return {}
+        return json.loads(value) if isinstance(value, str) else value
+
+    counts = {int(key): value for key, value in load(row.histogram).items()}
+
+    price_histogram = []
+    if row.lo is not None:
+        width = (row.hi - row.lo) / buckets
+        price_histogram = [
+            PriceBucket(
+                min=row.lo + width * i,
+                max=row.lo + width * (i + 1) if i < buckets - 1 else row.hi,
+                count=counts.get(i + 1, 0)
+            )
+            for i in range(buckets)
+        ]
+
+    return CourseFacets(
+        total_courses=row.total,
+        tags=load(row.tags),
+        categories=load(row.categories),
+        price_min=row.lo,
+        price_max=row.hi,
+        price_histogram=price_histogram,
+    )
+
+
+async def query_courses(
+    tags: Optional[List[str]],
+    parameters: CourseFilter,
+    db: AsyncSession,
+    projection: Optional[dict] = None,
+) -> bytes:
+
+    filters = build_course_filters(tags, parameters)
+
+    # Rows are read as mappings instead of ORM objects. Keyset pagination reads
+    # the key columns from each row, so they are always selected.
+    columns = {"id": Course.id, "createdAt": Course.createdAt, **(projection or course_columns())}
+    base_query = select(*[column.label(name) for name, column in columns.items()]).filter(*filters)
+
+    if parameters.pagination == "cursor" or parameters.after:
+        courses, next_cursor, total_courses = await paginate_keyset(
+            db=db,
+            base_query=base_query,
+            key_columns=[Course.createdAt, Course.id],
+            after=parameters.after,
+            page_size=parameters.page_size,
+            count=parameters.count,
+            as_mappings=True,
+        )
+        current_page = None
+        total_pages = (total_courses + parameters.page_size - 1) // parameters.page_size if total_courses is not None else None
+    else:
+        # Pages follow id order without a query, as the in-memory catalog serves them.
+        if parameters.q:
+            base_query = base_query.order_by(course_search_rank(parameters.q).desc(), Course.id)
+        else:
+            base_query = base_query.order_by(Course.id)
+
+        courses, total_courses, total_pages = await paginate(
+            db=db,
+            base_query=base_query,
+            page=parameters.page,
+            page_size=parameters.page_size,
+            count=parameters.count,
+            as_mappings=True,
+        )
+        current_page = parameters.page
+        next_cursor = None
+
+    if projection is not None:
+        page = ProjectedPaginationInfo(
+            courses=[{name: row[name] for name in projection} for row in courses],
+            current_page=current_page,
+            page_size=len(courses),
+            total_courses=total_courses,
+            total_pages=total_pages,
+            next_cursor=next_cursor,
+        )
+        return projected_pagination_adapter.dump_json(page)
+
+    page = PaginationInfo(
+        courses=course_list_adapter.validate_python([dict(row) for row in courses]),
+        current_page=current_page,
         page_size=len(courses),
         total_courses=total_courses,
         total_pages=total_pages,
+        next_cursor=next_cursor,
+    )
+    return pagination_adapter.dump_json(page)
+
+
+def export_courses(tags: Optional[List[str]], parameters: CourseFilter, format: ExportFormat):
+    query = (
+        select(*[column.label(name) for name, column in course_columns().items()])
+        .filter(*build_course_filters(tags, parameters))
+        .order_by(Course.id)
+    )
+    return stream_export(query, format)
+
+
+def bulk_response(results: List[CourseBulkResult]) -> CourseBulkResponse:
+    failed = sum(1 for result in results if result.status in ("invalid", "not_found"))
+    return CourseBulkResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+
+def invalid_item(index: int, error: Exception) -> CourseBulkResult:
+    if isinstance(error, ValidationError):
+        errors = validation_errors(error)
+    else:
+        errors = [{"loc": [], "msg": str(error)}]
+
+    return CourseBulkResult(index=index, status="invalid", errors=errors)
+
+
+async def insert_course_batch(db: AsyncSession, batch: list[tuple[int, dict]]) -> List[CourseBulkResult]:
+    result = await db.execute(
+        insert(Course).returning(Course.id, sort_by_parameter_order=True),
+        [row for _, row in batch]
     )
 
+    return [
+        CourseBulkResult(index=index, id=course_id, status="created")
+        for (index, _), course_id in zip(batch, result.scalars().all())
+    ]
+
+
+async def bulk_create_courses(db: AsyncSession, items: AsyncIterator[tuple[int, Any]]) -> CourseBulkResponse:
+    results = []
+    batch = []
+
+    async for index, item in items:
+        try:
+            if isinstance(item, ValueError):
+                raise item
+            course = CourseCreate.model_validate(item)
+        except ValueError as e:
+            results.append(invalid_item(index, e))
+            continue
+
+        batch.append((index, course.model_dump(mode="json")))
+
+        if len(batch) >= BULK_BATCH_SIZE:
+            results.extend(await insert_course_batch(db, batch))
+            batch = []
+
+    if batch:
+        results.extend(await insert_course_batch(db, batch))
+
+    await db.commit()
+    invalidate_course_cache()
+
+    return bulk_response(sorted(results, key=lambda result: result.index))
+
+
+async def update_course_batch(db: AsyncSession, batch: list[tuple[int, CourseBulkPatch]]) -> List[CourseBulkResult]:
+    ids = {patch.id for _, patch in batch}
+    result = await db.execute(select(Course.id).where(Course.id.in_(ids)))
+    existing = set(result.scalars().all())
+
+    now = datetime.utcnow()
+    rows = [
+        {**patch.model_dump(exclude_unset=True, mode="json"), "id": patch.id, "updatedAt": now}
+        for _, patch in batch if patch.id in existing
+    ]
+
+    if rows:
+        await db.execute(update(Course), rows)
+
+    return [
+        CourseBulkResult(index=index, id=patch.id, status="updated" if patch.id in existing else "not_found")
+        for index, patch in batch
+    ]
+
+
+async def bulk_patch_courses(db: AsyncSession, items: AsyncIterator[tuple[int, Any]]) -> CourseBulkResponse:
+    results = []
+    batch = []
+
+    async for index, item in items:
+        try:
+            if isinstance(item, ValueError):
+                raise item
+            patch = CourseBulkPatch.model_validate(item)
+        except ValueError as e:
+            results.append(invalid_item(index, e))
+            continue
+
+        batch.append((index, patch))
+
+        if len(batch) >= BULK_BATCH_SIZE:
+            results.extend(await update_course_batch(db, batch))
+            batch = []
+
+    if batch:
+        results.extend(await update_course_batch(db, batch))
+
+    await db.commit()
+    invalidate_course_cache()
+
+    return bulk_response(sorted(results, key=lambda result: result.index))
+
+
+async def delete_course_batch(db: AsyncSession, batch: list[tuple[int, int]]) -> List[CourseBulkResult]:
+    result = await db.execute(
+        delete(Course)
+        .where(Course.id.in_({course_id for _, course_id in batch}))
+        .returning(Course.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = set(result.scalars().all())
+
+    return [
+        CourseBulkResult(index=index, id=course_id, status="deleted" if course_id in deleted else "not_found")
+        for index, course_id in batch
+    ]
+
+
+async def bulk_delete_courses(db: AsyncSession, items: AsyncIterator[tuple[int, Any]]) -> CourseBulkResponse:
+    results = []
+    batch = []
+
+    async for index, item in items:
+        course_id = item.get("id") if isinstance(item, dict) else item
+
+        if not isinstance(course_id, int) or isinstance(course_id, bool):
+            results.append(invalid_item(index, ValueError("Expected a course id or {\"id\": <course id>}")))
+            continue
+
+        batch.append((index, course_id))
+
+        if len(batch) >= BULK_BATCH_SIZE:
+            results.extend(await delete_course_batch(db, batch))
+            batch = []
+
+    if batch:
+        results.extend(await delete_course_batch(db, batch))
+
+    await db.commit()
+    invalidate_course_cache()
+
+    return bulk_response(sorted(results, key=lambda result: result.index))
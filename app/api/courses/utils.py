@@ -1,13 +1,99 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import or_
-from fastapi import Depends
+from sqlalchemy import or_, func
+from fastapi import Depends, Request
 from app.config.models import Course
 from app.config.database import get_async_db
 from fastapi import HTTPException
 from typing import Optional, List
 from sqlalchemy.future import select
 from loguru import logger
-from app.api.courses.schemas import CourseFilter
+from app.api.courses.schemas import (
+    CourseFilter, CourseView, PaginationInfo,
+    ProjectedPaginationInfo
+)
+from app.config.environment import settings
+from app.shared.cache import TTLCache
+from app.api.courses.errors import InvalidBulkPayload, InvalidField
+from pydantic import ValidationError, TypeAdapter
+from typing import AsyncIterator, Any, Callable
+import json
+
+
+# Catalog pages keyed by normalized filters and caller visibility; cleared on every course write.
+course_cache = TTLCache("courses", maxsize=settings.COURSE_CACHE_SIZE, ttl=settings.COURSE_CACHE_TTL)
+facet_cache = TTLCache("course_facets", maxsize=settings.FACET_CACHE_SIZE, ttl=settings.FACET_CACHE_TTL)
+
+PAGING_FIELDS = {"page", "page_size", "pagination", "after", "count"}
+
+# Called after every committed course write, e.g. to refresh the in-memory catalog.
+course_write_hooks: list[Callable[[], None]] = []
+
+
+COURSE_FIELDS = [
+    "id", "title_ua", "title_en", "description_ua", "description_en",
+    "category", "tags", "durationText", "price", "link", "speaker",
+    "image", "isPublished", "createdAt", "updatedAt"
+]
+
+LOCALIZED_FIELDS = ["title", "description"]
+
+# Built once: listings validate a whole page of rows and encode it in a single call.
+course_list_adapter = TypeAdapter(List[CourseView])
+pagination_adapter = TypeAdapter(PaginationInfo)
+projected_pagination_adapter = TypeAdapter(ProjectedPaginationInfo)
+
+
+def course_columns() -> dict:
+    return {name: getattr(Course, name) for name in COURSE_FIELDS}
+
+
+def course_cache_key(
+    tags: Optional[List[str]],
+    parameters: CourseFilter,
+    is_admin: bool,
+    projection: Optional[dict] = None
+) -> tuple:
+    normalized_tags = tuple(sorted({tag.lower() for tag in tags})) if tags else None
+    projected = tuple((name, column.key) for name, column in projection.items()) if projection else None
+    return (normalized_tags, parameters.model_dump_json(), is_admin, projected)
+
+
+def course_projection(fields: Optional[List[str]], lang: Optional[str]) -> dict:
+    """
+    Maps response field names to `Course` columns. With `lang`, `title` and `description`
+    are taken from that language and, unless `fields` says otherwise, replace both language columns.
+    """
+    available = {name: getattr(Course, name) for name in COURSE_FIELDS}
+
+    if lang:
+        for name in LOCALIZED_FIELDS:
+            available[name] = getattr(Course, f"{name}_{lang}")
+
+    if fields:
+        requested = [name.strip() for item in fields for name in item.split(",") if name.strip()]
+    else:
+        requested = [
+            name for name in available
+            if not any(name.startswith(f"{localized}_") for localized in LOCALIZED_FIELDS)
+        ]
+
+    if not requested or any(name not in available for name in requested):
+        raise InvalidField
+
+    return {name: available[name] for name in dict.fromkeys(requested)}
+
+
+def facet_cache_key(tags: Optional[List[str]], parameters: CourseFilter, is_admin: bool, buckets: int) -> tuple:
+    normalized_tags = tuple(sorted({tag.lower() for tag in tags})) if tags else None
+    return (normalized_tags, parameters.model_dump_json(exclude=PAGING_FIELDS), is_admin, buckets)
+
+
+def invalidate_course_cache():
+    course_cache.clear()
+    facet_cache.clear()
+
+    for hook in course_write_hooks:
+        hook()
 
 
 async def get_course_by_id(id: int, db: AsyncSession = Depends(get_async_db)) -> Course:
@@ -18,6 +104,14 @@ async def get_course_by_id(id: int, db: AsyncSession = Depends(get_async_db)) ->
     return item
 
 
+def course_search_query(q: str):
+    return func.websearch_to_tsquery('english', q).op('||')(func.websearch_to_tsquery('simple', q))
+
+
+def course_search_rank(q: str):
+    return func.ts_rank_cd(Course.search_vector, course_search_query(q))
+
+
 def build_course_filters(tags: Optional[List[str]], parameters: CourseFilter):
     
     def add_filter(condition):
@@ -30,6 +124,7 @@ def build_course_filters(tags: Optional[List[str]], parameters: CourseFilter):
         tags = [item.lower() for item in tags]
         logger.debug(f"Received tags: {tags}")
 
+    add_filter(Course.search_vector.op('@@')(course_search_query(parameters.q)) if parameters.q else None)
     
     add_filter(
         or_(
@@ -46,7 +141,8 @@ def build_course_filters(tags: Optional[List[str]], parameters: CourseFilter):
     )
 
     add_filter(Course.category.ilike(f"%{parameters.category}%") if parameters.category else None)
-    add_filter(Course.tags.overlap(tags) if tags else None)
+    if tags:
+        add_filter(Course.tags.contains(tags) if parameters.tags_mode == "all" else Course.tags.overlap(tags))
 
     add_filter(Course.durationText.ilike(f"%{parameters.durationText}%") if parameters.durationText else None)
 
@@ -61,3 +157,49 @@ def build_course_filters(tags: Optional[List[str]], parameters: CourseFilter):
     add_filter(Course.isPublished == parameters.isPublished if parameters.isPublished else None)
     
     return filters
+
+
+def validation_errors(error: ValidationError) -> list[dict]:
+    return [{"loc": list(item["loc"]), "msg": item["msg"]} for item in error.errors()]
+
+
+async def iter_bulk_items(request: Request) -> AsyncIterator[tuple[int, Any]]:
+    """
+    Yields (index, item) pairs from a JSON array body, or line by line from an NDJSON body
+    without buffering it. Lines that are not valid JSON are yielded as the `ValueError`.
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" not in content_type and "jsonl" not in content_type:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise InvalidBulkPayload
+
+        if not isinstance(body, list):
+            raise InvalidBulkPayload
+
+        for index, item in enumerate(body):
+            yield index, item
+        return
+
+    def parse(line: bytes):
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            return e
+
+    index = 0
+    buffer = b""
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+
+        for line in lines:
+            if line.strip():
+                yield index, parse(line)
+                index += 1
+
+    if buffer.strip():
+        yield index, parse(buffer)
@@ -0,0 +1,5 @@
+class NonExistentArticle(Exception):
+    message = {
+        "en": "This article does not exist.",
+        "ua": "Цієї статті не існує."
+    }
@@ -0,0 +1,296 @@
+"""
+Article ingestion: crawls the listing pages in INSIGHTS_SOURCES, parses linked articles
+into the `Article` shape and upserts them by URL.
+
+    python -m app.api.insights.ingestion [listing URL ...]
+"""
+from sqlalchemy import select, or_
+from sqlalchemy.dialects.postgresql import insert
+from app.config.models import Article, UNKNOWN_ARTICLE_DATE
+from app.config.database import AsyncSessionLocal
+from app.config.environment import settings
+from app.api.insights.utils import parse_article_date, snapshot_cache, watermark_cache
+from bs4 import BeautifulSoup
+from pydantic import HttpUrl, TypeAdapter, ValidationError
+from datetime import datetime, timezone
+from urllib.parse import urljoin, urlparse, urldefrag
+from typing import Optional
+from loguru import logger
+import argparse
+import asyncio
+import hashlib
+import httpx
+
+
+UPSERT_BATCH_SIZE = 200
+
+# Called after an ingestion run changed at least one article.
+ingestion_hooks: list = [snapshot_cache.clear, watermark_cache.clear]
+
+worker: Optional[asyncio.Task] = None
+
+http_url_adapter = TypeAdapter(HttpUrl)
+
+
+def meta_content(soup: BeautifulSoup, *names: str) -> Optional[str]:
+    for name in names:
+        tag = soup.find("meta", attrs={"property": name}) or soup.find("meta", attrs={"name": name})
+        if tag and tag.get("content", "").strip():
+            return tag["content"].strip()
+    return None
+
+
+def meta_url(soup: BeautifulSoup, base_url: str, *names: str) -> Optional[str]:
+    """First of the meta tags `names` holding an http(s) URL (relative ones are resolved against `base_url`)."""
+    for name in names:
+        value = meta_content(soup, name)
+        if not value:
+            continue
+
+        url = urljoin(base_url, value)
+        if urlparse(url).scheme not in ("http", "https"):
+            continue
+
+        # Listings validate these as HttpUrl; a value that fails there would break the whole page.
+        try:
+            http_url_adapter.validate_python(url)
+        except ValidationError:
+            continue
+        return url
+
+    return None
+
+
+def extract_article_links(html: str, listing_url: str, limit: int) -> list[str]:
+    """
+    Links to articles on a listing page: anchors inside <article> elements or, failing that,
+    same-site links below the listing path.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    listing = urlparse(listing_url)
+
+    anchors = [a for article in soup.find_all("article") for a in article.find_all("a", href=True)]
+    same_section = not anchors
+    if same_section:
+        anchors = soup.find_all("a", href=True)
+
+    links = []
+    for anchor in anchors:
+        url, _ = urldefrag(urljoin(listing_url, anchor["href"]))
+        parsed = urlparse(url)
+
+        if parsed.scheme not in ("http", "https") or parsed.netloc != listing.netloc:
+            continue
+        if same_section and (not parsed.path.startswith(listing.path) or parsed.path.rstrip("/") == listing.path.rstrip("/")):
+            continue
+        if url not in links:
+            links.append(url)
+        if len(links) >= limit:
+            break
+
+    return links
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(" ".join(content.split()).lower().encode()).hexdigest()
+
+
+def parse_article(html: str, url: str) -> Optional[dict]:
+    soup = BeautifulSoup(html, "html.parser")
+
+    heading = soup.find("h1")
+    title = meta_content(soup, "og:title", "twitter:title") or (heading.get_text(strip=True) if heading else None)
+
+    # data: URIs, empty values and other schemes are skipped; without any usable image the page is not an article.
+    image = meta_url(soup, url, "og:image", "twitter:image")
+    thumbnail = meta_url(soup, url, "twitter:image", "og:image")
+
+    body = soup.find("article") or soup.find("main") or soup.body
+    paragraphs = [p.get_text(" ", strip=True) for p in body.find_all("p")] if body else []
+    content = "\n\n".join(p for p in paragraphs if p)
+
+    if not title or not image or not content:
+        return None
+
+    excerpt = meta_content(soup, "og:description", "description") or paragraphs[0][:300]
+
+    time_tag = soup.find("time")
+    date = (
+        meta_content(soup, "article:published_time", "date", "pubdate")
+        or (time_tag.get("datetime") or time_tag.get_text(strip=True) if time_tag else None)
+    )
+    if not date:
+        # Undated pages are dated by the crawl; a date that cannot be parsed is not.
+        date = datetime.now(timezone.utc).isoformat()
+    published_at = parse_article_date(date) or UNKNOWN_ARTICLE_DATE
+
+    html_tag = soup.find("html")
+    lang = (html_tag.get("lang", "") if html_tag else "").lower()
+
+    return {
+        "url": url,
+        "thumbnail": thumbnail,
+        "image": image,
+        "title": title,
+        "content": content,
+        "date": date,
+        "excerpt": excerpt,
+        "lang": "UA" if lang.startswith(("uk", "ua")) else "EN",
+        "category": meta_content(soup, "article:section") or "General",
+        "published_at": published_at,
+        "content_hash": content_hash(content),
+    }
+
+
+async def fetch(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, url: str) -> Optional[str]:
+    async with semaphore:
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.text
+        except httpx.HTTPError as e:
+            logger.warning(f"Could not fetch {url}: {str(e)}")
+            return None
+
+
+async def crawl(client: httpx.AsyncClient, sources: list[str]) -> list[dict]:
+    semaphore = asyncio.Semaphore(settings.INSIGHTS_CRAWL_CONCURRENCY)
+
+    listings = await asyncio.gather(*[fetch(client, semaphore, source) for source in sources])
+
+    links = []
+    for source, html in zip(sources, listings):
+        if html is not None:
+            links.extend(await asyncio.to_thread(
+                extract_article_links, html, source, settings.INSIGHTS_MAX_ARTICLES_PER_SOURCE
+            ))
+    links = list(dict.fromkeys(links))
+
+    async def fetch_article(url: str) -> Optional[dict]:
+        html = await fetch(client, semaphore, url)
+        return await asyncio.to_thread(parse_article, html, url) if html is not None else None
+
+    articles = await asyncio.gather(*[fetch_article(url) for url in links])
+    return [article for article in articles if article is not None]
+
+
+def site_of(url: str) -> str:
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}/"
+
+
+async def upsert_articles(articles: list[dict]) -> int:
+    """Inserts new articles and updates changed ones. Returns the number of rows written."""
+    unique = {}
+    seen_hashes = set()
+    for article in articles:
+        if article["url"] in unique or article["content_hash"] in seen_hashes:
+            continue
+        unique[article["url"]] = article
+        seen_hashes.add(article["content_hash"])
+
+    written = 0
+    async with AsyncSessionLocal() as db:
+        batch_list = list(unique.values())
+
+        for start in range(0, len(batch_list), UPSERT_BATCH_SIZE):
+            batch = batch_list[start:start + UPSERT_BATCH_SIZE]
+
+            # The same content already stored under another URL of the sites being crawled is a
+            # syndicated copy. Rows of other sites never suppress an article.
+            sites = {site_of(article["url"]) for article in batch}
+            result = await db.execute(
+                select(Article.content_hash, Article.url)
+                .where(Article.content_hash.in_([article["content_hash"] for article in batch]))
+                .where(or_(*[Article.url.startswith(site, autoescape=True) for site in sites]))
+            )
+            copies = {content: url for content, url in result.all()}
+            batch = [
+                article for article in batch
+                if copies.get(article["content_hash"], article["url"]) == article["url"]
+            ]
+            if not batch:
+                continue
+
+            query = insert(Article).values(batch)
+            query = query.on_conflict_do_update(
+                index_elements=[Article.url],
+                set_={
+                    column: query.excluded[column]
+                    for column in batch[0] if column != "url"
+                },
+                where=Article.content_hash.is_distinct_from(query.excluded.content_hash),
+            ).returning(Article.id)
+
+            result = await db.execute(query)
+            written += len(result.all())
+
+        await db.commit()
+
+    return written
+
+
+async def run_ingestion(sources: Optional[list[str]] = None, client: Optional[httpx.AsyncClient] = None) -> int:
+    sources = sources if sources is not None else settings.INSIGHTS_SOURCES
+    if not sources:
+        return 0
+
+    started = datetime.now(timezone.utc)
+
+    if client is None:
+        async with httpx.AsyncClient(
+            timeout=20.0,
+            follow_redirects=True,
+            headers={"User-Agent": "FintechInsightsBot/1.0"},
+            limits=httpx.Limits(
+                max_connections=settings.INSIGHTS_CRAWL_CONCURRENCY,
+                max_keepalive_connections=settings.INSIGHTS_CRAWL_CONCURRENCY,
+            ),
+        ) as pooled:
+            articles = await crawl(pooled, sources)
+    else:
+        articles = await crawl(client, sources)
+
+    written = await upsert_articles(articles)
+
+    logger.info(
+        f"Ingested {len(articles)} articles from {len(sources)} sources, {written} new or changed "
+        f"in {(datetime.now(timezone.utc) - started).total_seconds():.1f}s"
+    )
+
+    if written:
+        for hook in ingestion_hooks:
+            hook()
+
+    return written
+
+
+async def ingestion_worker():
+    while True:
+        try:
+            await run_ingestion()
+        except Exception as e:
+            logger.critical(f"Article ingestion failed: {str(e)}")
+
+        await asyncio.sleep(settings.INSIGHTS_INGEST_INTERVAL)
+
+
+async def start_ingestion_worker():
+    global worker
+
+    if settings.INSIGHTS_INGEST_INTERVAL > 0 and settings.INSIGHTS_SOURCES:
+        worker = asyncio.create_task(ingestion_worker())
+
+
+async def stop_ingestion_worker():
+    if worker is not None:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="Listing URLs (default: INSIGHTS_SOURCES)")
+    args = parser.parse_args()
+
+    asyncio.run(run_ingestion(args.sources or None))
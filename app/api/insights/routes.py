@@ -1,40 +1,103 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.api.insights.schemas import NewsItem
-from app.api.auth.services import get_user, get_optional_user
+from app.api.insights.schemas import NewsItem, NewsSummary
 from app.config.database import get_async_db
-from app.api.auth.schemas import CurrentUser
 from typing import List, Optional
-from app.api.insights.services import get_filtered_articles
-from app.config.docs import user_required
+from app.api.insights.services import get_filtered_articles, get_news_snapshot, get_article
+from app.api.insights.utils import news_list_adapter, negotiate_encoding
+from app.api.insights.errors import NonExistentArticle
+from app.shared.errors import InvalidCursor
 
 
 insights_router = APIRouter()
 
 
-@insights_router.get("/en", tags=["Insights"], 
+async def get_news_page(request: Request, db: AsyncSession, lang: str, limit: int, after: Optional[str]) -> Response:
+    if after:
+        try:
+            articles, next_cursor = await get_filtered_articles(db, lang, limit, after)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message)
+
+        items = news_list_adapter.validate_python(articles, from_attributes=True)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return Response(news_list_adapter.dump_json(items), media_type="application/json", headers=headers)
+
+    # Cached and 304 responses only touch the database to re-read the watermark every few seconds.
+    snapshot = await get_news_snapshot(db, lang, limit)
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+
+    headers = {
+        "ETag": snapshot.etags[encoding],
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-cache",
+    }
+    if snapshot.next_cursor:
+        headers["X-Next-Cursor"] = snapshot.next_cursor
+
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+
+    return Response(snapshot.bodies[encoding], media_type="application/json", headers=headers)
+
+
+@insights_router.get("/en", tags=["Insights"], response_model=List[NewsSummary],
                      responses={
-                         **user_required
+                         304: { "description": "The `If-None-Match` ETag is still current." },
+                         400: { "description": InvalidCursor.message['en'] }
                      })
 async def get_en_news(
-    db: AsyncSession = Depends(get_async_db),
-    current_user: Optional[CurrentUser] = Depends(get_optional_user)
-) -> List[NewsItem]:
+    request: Request,
+    limit: int = Query(10, ge=1, le=50),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
     '''
-    Retrieves a list of 10 insights in English.
+    Retrieves the latest insights in English, newest first (10 by default), without their content.
+    To get the next page, pass the `X-Next-Cursor` response header as `after`.
+    The first page carries an `ETag`; send it back as `If-None-Match` to get 304 while nothing changed.
+    New and removed articles show up within INSIGHTS_WATERMARK_TTL seconds; edits to existing
+    ones made outside the ingestion worker within INSIGHTS_SNAPSHOT_TTL seconds.
     '''
-    return await get_filtered_articles(db, "EN")
+    return await get_news_page(request, db, "EN", limit, after)
 
 
-@insights_router.get("/ua", tags=["Insights"],
+@insights_router.get("/ua", tags=["Insights"], response_model=List[NewsSummary],
                      responses={
-                         **user_required
+                         304: { "description": "The `If-None-Match` ETag is still current." },
+                         400: { "description": InvalidCursor.message['en'] }
                      })
 async def get_ua_news(
-    db: AsyncSession = Depends(get_async_db),
-    current_user: Optional[CurrentUser] = Depends(get_optional_user)
-) -> List[NewsItem]:
+    request: Request,
+    limit: int = Query(10, ge=1, le=50),
+    after: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    '''
+    Retrieves the latest insights in Ukrainian, newest first (10 by default), without their content.
+    To get the next page, pass the `X-Next-Cursor` response header as `after`.
+    The first page carries an `ETag`; send it back as `If-None-Match` to get 304 while nothing changed.
+    New and removed articles show up within INSIGHTS_WATERMARK_TTL seconds; edits to existing
+    ones made outside the ingestion worker within INSIGHTS_SNAPSHOT_TTL seconds.
+    '''
+    return await get_news_page(request, db, "UA", limit, after)
+
+
+@insights_router.get("/{id}", tags=["Insights"],
+                     responses={
+                         404: { "description": NonExistentArticle.message['en'] }
+                     })
+async def get_single_news(
+    id: int,
+    db: AsyncSession = Depends(get_async_db)
+) -> NewsItem:
     '''
-    Retrieves a list of 10 insights in Ukrainian.
+    Retrieves a single insight by ID, including its full content.
     '''
-    return await get_filtered_articles(db, "UA")
+    try:
+        return await get_article(db, id)
+    except NonExistentArticle as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=e.message)
@@ -1,15 +1,23 @@
 from pydantic import BaseModel, HttpUrl
+from datetime import datetime
+from typing import Optional
 
-class NewsItem(BaseModel):
+
+class NewsSummary(BaseModel):
+    id: int
     url: HttpUrl
     thumbnail: HttpUrl
     image: HttpUrl
     title: str
-    content: str
     date: str
     excerpt: str
     lang: str
     category: str
+    published_at: Optional[datetime] = None
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class NewsItem(NewsSummary):
+    content: str
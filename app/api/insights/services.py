@@ -1,10 +1,65 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.orm import defer
 from app.config.models import Article
+from app.api.insights.errors import NonExistentArticle
+from app.api.insights.utils import NewsSnapshot, snapshot_cache, watermark_cache, build_snapshot
+from app.shared.utils import paginate_keyset
+from typing import Optional
 
 
-async def get_filtered_articles(db: AsyncSession, lang: str) -> list[Article]:
-    result = await db.execute(
-        select(Article).where(Article.lang == lang)
+async def get_filtered_articles(
+    db: AsyncSession,
+    lang: str,
+    limit: int,
+    after: Optional[str] = None
+) -> tuple[list[Article], Optional[str]]:
+    articles, next_cursor, _ = await paginate_keyset(
+        db=db,
+        base_query=(
+            select(Article)
+            .options(defer(Article.content, raiseload=True))
+            .where(Article.lang == lang, Article.published_at.is_not(None))
+        ),
+        key_columns=[Article.published_at, Article.id],
+        after=after,
+        page_size=limit,
+        count="none",
+        descending=True,
     )
-    return result.scalars().all()
\ No newline at end of file
+    return articles, next_cursor
+
+
+async def get_articles_watermark(db: AsyncSession, lang: str) -> tuple:
+    async def load() -> tuple:
+        result = await db.execute(
+            select(func.count(), func.max(Article.id), func.max(Article.published_at))
+            .where(Article.lang == lang)
+        )
+        return tuple(result.one())
+
+    return await watermark_cache.get_or_load(lang, load)
+
+
+async def get_news_snapshot(db: AsyncSession, lang: str, limit: int) -> NewsSnapshot:
+    """
+    The first listing page, encoded and compressed once until articles change. Inserts and
+    deletes from any process are picked up within INSIGHTS_WATERMARK_TTL seconds; in-place edits
+    made outside this process's ingestion within INSIGHTS_SNAPSHOT_TTL seconds.
+    """
+    watermark = await get_articles_watermark(db, lang)
+
+    async def load() -> NewsSnapshot:
+        articles, next_cursor = await get_filtered_articles(db, lang, limit)
+        return build_snapshot(articles, next_cursor)
+
+    return await snapshot_cache.get_or_load((lang, limit, watermark), load)
+
+
+async def get_article(db: AsyncSession, identifier: int) -> Article:
+    article = await db.get(Article, identifier)
+
+    if article is None:
+        raise NonExistentArticle
+
+    return article
@@ -0,0 +1,171 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, event, inspect
+from app.config.models import Article, UNKNOWN_ARTICLE_DATE
+from app.config.environment import settings
+from app.api.insights.schemas import NewsSummary
+from app.shared.cache import TTLCache
+from pydantic import TypeAdapter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, List
+from loguru import logger
+import hashlib
+import gzip
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+news_list_adapter = TypeAdapter(List[NewsSummary])
+
+# First pages of the listings, keyed by (lang, limit, watermark). Cleared after ingestion changes articles.
+snapshot_cache = TTLCache("insights_snapshots", maxsize=100, ttl=settings.INSIGHTS_SNAPSHOT_TTL)
+
+# (count, max id, max published_at) of each language, re-read at most every INSIGHTS_WATERMARK_TTL
+# seconds. Articles added or removed by another process change it, which moves listings to a new snapshot.
+watermark_cache = TTLCache("insights_watermarks", maxsize=16, ttl=settings.INSIGHTS_WATERMARK_TTL)
+
+# Preferred first when the client accepts several with the same quality.
+ENCODINGS = ["br", "gzip", "identity"] if brotli is not None else ["gzip", "identity"]
+
+
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%d.%m.%Y",
+    "%d/%m/%Y",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%B %d, %Y",
+    "%b %d, %Y",
+    "%B %d %Y",
+]
+
+UA_MONTHS = {
+    "січня": 1, "лютого": 2, "березня": 3, "квітня": 4, "травня": 5, "червня": 6,
+    "липня": 7, "серпня": 8, "вересня": 9, "жовтня": 10, "листопада": 11, "грудня": 12,
+}
+
+UA_DATE = re.compile(r"^(\d{1,2})\s+([а-яіїєґ']+)\s+(\d{4})", re.IGNORECASE)
+
+
+def parse_article_date(value: str) -> Optional[datetime]:
+    value = value.strip()
+
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        parsed = None
+
+    if parsed is None:
+        for date_format in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(value, date_format)
+                break
+            except ValueError:
+                continue
+
+    if parsed is None:
+        match = UA_DATE.match(value)
+        if match and match.group(2).lower() in UA_MONTHS:
+            parsed = datetime(int(match.group(3)), UA_MONTHS[match.group(2).lower()], int(match.group(1)))
+
+    if parsed is None:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+
+    return parsed
+
+
+@event.listens_for(Article, "before_insert")
+@event.listens_for(Article, "before_update")
+def fill_published_at(mapper, connection, target: Article):
+    """ORM writes parse `date` here; the database trigger only understands the formats Postgres does."""
+    state = inspect(target)
+    date_changed = state.attrs.date.history.has_changes()
+    published_changed = state.attrs.published_at.history.has_changes()
+
+    if target.date and (target.published_at is None or (date_changed and not published_changed)):
+        target.published_at = parse_article_date(target.date) or UNKNOWN_ARTICLE_DATE
+
+
+async def backfill_article_dates(db: AsyncSession) -> int:
+    result = await db.execute(select(Article.id, Article.date).where(Article.published_at.is_(None)))
+    rows = [
+        {"id": article_id, "published_at": parse_article_date(date) or UNKNOWN_ARTICLE_DATE}
+        for article_id, date in result.all()
+    ]
+
+    if rows:
+        await db.execute(update(Article), rows)
+        await db.commit()
+
+        unknown = sum(1 for row in rows if row["published_at"] == UNKNOWN_ARTICLE_DATE)
+        logger.info(f"Backfilled published_at for {len(rows)} articles ({unknown} with unparseable dates)")
+
+    return len(rows)
+
+
+class NewsSnapshot:
+    """A listing page encoded once into every supported content coding, with their ETags."""
+
+    def __init__(self, body: bytes, next_cursor: Optional[str]):
+        self.next_cursor = next_cursor
+
+        digest = hashlib.sha256(body).hexdigest()[:32]
+
+        self.bodies = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=11)
+
+        # Strong validators must differ between codings of the same content.
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.bodies
+        }
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or not tags.isdisjoint(self.etags.values())
+
+
+def build_snapshot(articles: list[Article], next_cursor: Optional[str]) -> NewsSnapshot:
+    items = news_list_adapter.validate_python(articles, from_attributes=True)
+    return NewsSnapshot(news_list_adapter.dump_json(items), next_cursor)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """Picks the content coding for an Accept-Encoding header, "identity" when nothing better fits."""
+    if not accept_encoding:
+        return "identity"
+
+    qualities = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        qualities[name.strip().lower()] = quality
+
+    # Identity is the fallback rather than a competitor: any accepted compression wins over it.
+    compressed = [encoding for encoding in ENCODINGS if encoding != "identity"]
+    accepted = [encoding for encoding in compressed if qualities.get(encoding, qualities.get("*", 0.0)) > 0]
+    if not accepted:
+        return "identity"
+
+    return max(accepted, key=lambda encoding: (
+        qualities.get(encoding, qualities.get("*", 0.0)), -compressed.index(encoding)
+    ))
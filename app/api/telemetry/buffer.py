@@ -0,0 +1,176 @@
+from sqlalchemy.dialects.postgresql import insert
+from app.config.models import UserSession
+from app.config.database import AsyncSessionLocal
+from app.config.environment import settings
+from app.api.telemetry.rollups import record_activity, prune_minute_rollups
+from app.api.telemetry.partitions import split_by_month
+from datetime import datetime
+from typing import Optional
+from loguru import logger
+import asyncio
+import time
+
+
+class SessionBuffer:
+    """
+    Write-behind queue for `UserSession` records.
+
+    Records are flushed with one multi-row INSERT per SESSION_FLUSH_SIZE rows, at the latest
+    SESSION_FLUSH_INTERVAL seconds after they arrive. When SESSION_BUFFER_LIMIT records are
+    waiting, producers wait up to SESSION_BUFFER_PUT_TIMEOUT for room and the record is dropped
+    after that. Rows of a failed flush are retried with the next one, after an exponential
+    backoff capped at SESSION_FLUSH_MAX_BACKOFF seconds. The activity rollups of the records
+    are written in the same transaction. Records crossing a month boundary are
+    split into one record per month, so each lands in a single `sessions` partition.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.SESSION_BUFFER_LIMIT)
+        # Taken off the queue but not written yet.
+        self.pending: list[dict] = []
+        self.task: Optional[asyncio.Task] = None
+        # Write-through callers flush concurrently; each must write and trim only its own snapshot.
+        self.flush_lock = asyncio.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    async def put(self, start: datetime, end: datetime, ip: str, country: str, user: int):
+        records = [
+            {"started_at": lower, "period": (lower, upper), "country": country, "ip": ip, "user": user}
+            for lower, upper in split_by_month(start, end)
+        ]
+
+        if self.task is None:
+            # Not running (or already shut down): write through.
+            self.pending.extend(records)
+            await self.flush()
+            return
+
+        for record in records:
+            try:
+                await asyncio.wait_for(self.queue.put(record), timeout=settings.SESSION_BUFFER_PUT_TIMEOUT)
+            except asyncio.TimeoutError:
+                self.dropped += 1
+                logger.warning(f"Session buffer is full ({self.queue.qsize()} records), dropping a record of user {user}")
+                continue
+
+            self.enqueued += 1
+
+    async def flush(self) -> bool:
+        async with self.flush_lock:
+            if not self.pending:
+                return True
+
+            rows = list(self.pending)
+            started = time.perf_counter()
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    for start in range(0, len(rows), settings.SESSION_FLUSH_SIZE):
+                        await db.execute(insert(UserSession).values(rows[start:start + settings.SESSION_FLUSH_SIZE]))
+                    await record_activity(db, [
+                        (*row["period"], row["user"], row["country"]) for row in rows
+                    ])
+                    await db.commit()
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"Could not flush {len(rows)} session records: {str(e)}")
+                self.trim()
+                return False
+
+            del self.pending[:len(rows)]
+
+            elapsed = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.written += len(rows)
+            self.last_flush_ms = elapsed
+            self.max_flush_ms = max(self.max_flush_ms, elapsed)
+            self.total_flush_ms += elapsed
+
+        try:
+            await prune_minute_rollups()
+        except Exception as e:
+            logger.warning(f"Could not prune minute rollups: {str(e)}")
+
+        return True
+
+    def trim(self):
+        """Drops the oldest unwritten rows beyond SESSION_BUFFER_LIMIT."""
+        overflow = len(self.pending) - settings.SESSION_BUFFER_LIMIT
+        if overflow > 0:
+            del self.pending[:overflow]
+            self.dropped += overflow
+
+    def retry_delay(self, failures: int) -> float:
+        return min(settings.SESSION_FLUSH_INTERVAL * 2 ** failures, settings.SESSION_FLUSH_MAX_BACKOFF)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        failures = 0
+
+        while True:
+            wait = self.retry_delay(failures) if failures else settings.SESSION_FLUSH_INTERVAL
+            deadline = loop.time() + wait
+
+            # After a failed flush, keep taking records off the queue until the backoff ends, so
+            # producers are not blocked and trimming to SESSION_BUFFER_LIMIT drops the oldest rows.
+            while failures or len(self.pending) < settings.SESSION_FLUSH_SIZE:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    self.pending.append(await asyncio.wait_for(self.queue.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    break
+                self.trim()
+
+            if self.pending:
+                failures = 0 if await self.flush() else failures + 1
+
+    def drain(self):
+        while not self.queue.empty():
+            self.pending.append(self.queue.get_nowait())
+
+    async def start(self):
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+        self.drain()
+
+        for _ in range(3):
+            if not self.pending or await self.flush():
+                break
+            await asyncio.sleep(1)
+
+        if self.pending:
+            logger.critical(f"Lost {len(self.pending)} session records on shutdown")
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "pending": len(self.pending),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": self.max_flush_ms,
+            "avg_flush_ms": self.total_flush_ms / self.flushes if self.flushes else 0.0,
+        }
+
+
+session_buffer = SessionBuffer()
@@ -0,0 +1,144 @@
+from fastapi import WebSocket
+from app.config.environment import settings
+from datetime import datetime, timedelta, timezone
+from loguru import logger
+import asyncio
+import math
+
+
+PING = "ping"
+PONG = "pong"
+
+
+class ConnectionLimit:
+    """Per-worker cap on open telemetry websockets, with counters for the admin endpoints."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.peak = 0
+        self.accepted = 0
+        self.rejected = 0
+        self.heartbeat_timeouts = 0
+        self.idle_timeouts = 0
+
+    def acquire(self) -> bool:
+        if self.active >= self.limit:
+            self.rejected += 1
+            return False
+
+        self.active += 1
+        self.accepted += 1
+        self.peak = max(self.peak, self.active)
+        return True
+
+    def release(self):
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "limit": self.limit,
+            "peak": self.peak,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "heartbeat_timeouts": self.heartbeat_timeouts,
+            "idle_timeouts": self.idle_timeouts,
+        }
+
+
+telemetry_connections = ConnectionLimit(settings.WS_MAX_CONNECTIONS)
+
+
+# What uvicorn's websockets implementation reports for a connection lost without a closing
+# handshake, including a protocol-level ping that went unanswered.
+ABNORMAL_CLOSURE = 1006
+
+
+def dropped_at(code: int, last_seen: datetime) -> datetime:
+    """
+    End of the session of a peer whose connection closed with `code`.
+
+    A protocol-level ping (WS_PROTOCOL_PING_INTERVAL) that goes unanswered for
+    WS_PROTOCOL_PING_TIMEOUT seconds closes the connection with 1006; the peer was last known alive
+    when that ping was sent, so the session ends WS_PROTOCOL_PING_TIMEOUT before the close was
+    noticed (never before the peer's last message). A TCP connection torn down without a close
+    frame is reported the same way and loses up to that long. Any other close was noticed as it
+    happened.
+    """
+    now = datetime.now(timezone.utc)
+    if code == ABNORMAL_CLOSURE:
+        return max(last_seen, now - timedelta(seconds=settings.WS_PROTOCOL_PING_TIMEOUT))
+    return now
+
+
+async def hold_connection(websocket: WebSocket, started_at: datetime) -> datetime:
+    """
+    Keeps a telemetry websocket open until the peer leaves and returns when its session ended.
+
+    Half-open connections are detected by uvicorn's protocol-level pings, which browsers answer
+    without any client code. With WS_PING_INTERVAL > 0 the server also sends a text "ping" after
+    that many seconds without a message; a client that has answered "pong" at least once is
+    closed (1001) when a later ping goes unanswered for WS_PING_TIMEOUT seconds, and its session
+    ends at its last message. Clients that never answer are not pinged again, so a missing pong
+    never shortens a session. With WS_IDLE_TIMEOUT > 0, a peer that sends nothing but pongs for
+    that long is closed as idle and its session ends at its last other message.
+    """
+    loop = asyncio.get_running_loop()
+    opened = last_seen = last_active = loop.time()
+
+    def moment(at: float) -> datetime:
+        return started_at + timedelta(seconds=at - opened)
+
+    interval = settings.WS_PING_INTERVAL if settings.WS_PING_INTERVAL > 0 else math.inf
+    ping_due = opened + interval
+    pong_due = None
+    answers_pings = False
+
+    try:
+        while True:
+            now = loop.time()
+
+            if settings.WS_IDLE_TIMEOUT > 0 and now >= last_active + settings.WS_IDLE_TIMEOUT:
+                telemetry_connections.idle_timeouts += 1
+                await websocket.close(code=1001, reason="Idle timeout.")
+                return moment(last_active)
+
+            if pong_due is not None and now >= pong_due:
+                if answers_pings:
+                    telemetry_connections.heartbeat_timeouts += 1
+                    await websocket.close(code=1001, reason="Heartbeat timeout.")
+                    return moment(last_seen)
+
+                # The client does not speak the heartbeat; leave it to protocol-level pings.
+                interval = ping_due = math.inf
+                pong_due = None
+
+            if pong_due is None and now >= ping_due:
+                await websocket.send_text(PING)
+                pong_due = now + settings.WS_PING_TIMEOUT
+                continue
+
+            wake = pong_due if pong_due is not None else ping_due
+            if settings.WS_IDLE_TIMEOUT > 0:
+                wake = min(wake, last_active + settings.WS_IDLE_TIMEOUT)
+
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=None if wake == math.inf else wake - now)
+            except asyncio.TimeoutError:
+                continue
+
+            if message["type"] == "websocket.disconnect":
+                return dropped_at(message.get("code", 1000), moment(last_seen))
+
+            last_seen = loop.time()
+            if message.get("text") == PONG:
+                answers_pings = True
+            else:
+                last_active = last_seen
+
+            ping_due = last_seen + interval
+            pong_due = None
+    except Exception as e:
+        logger.debug(f"Telemetry WS dropped: {e}")
+        return datetime.now(timezone.utc)
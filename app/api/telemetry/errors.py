@@ -2,4 +2,10 @@ class CannotSuspendAnotherAdmin(Exception):
     message = {
         "en": "You cannot block other administrators.",
         "ua": "Ви не можете блокувати інших адміністраторів."
-    }
\ No newline at end of file
+    }
+
+class WindowTooLarge(Exception):
+    message = {
+        "en": "Minute buckets are only kept for a limited number of recent days. Use a shorter window or a larger bucket.",
+        "ua": "Хвилинні інтервали зберігаються лише за обмежену кількість останніх днів. Оберіть коротший період або більший інтервал."
+    }
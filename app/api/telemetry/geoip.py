@@ -0,0 +1,205 @@
+from app.config.environment import settings
+from app.shared.cache import TTLCache
+from array import array
+from typing import Optional
+from loguru import logger
+import asyncio
+import bisect
+import csv
+import gzip
+import ipaddress
+import httpx
+
+try:
+    import maxminddb
+except ImportError:
+    maxminddb = None
+
+
+UNKNOWN_COUNTRY = "Unknown"
+
+IPV4_MAPPED = 0xFFFF00000000
+
+country_cache = TTLCache("geoip", maxsize=settings.GEOIP_CACHE_SIZE, ttl=settings.GEOIP_CACHE_TTL)
+
+
+def parse_address(value: str) -> int:
+    value = value.strip()
+    return int(value) if value.isdigit() else int(ipaddress.ip_address(value))
+
+
+class RangeTable:
+    """
+    Non-overlapping address ranges of one IP version in parallel sorted arrays, searched with bisect.
+    IPv6 addresses do not fit machine integers, so that table keeps plain lists.
+    """
+
+    def __init__(self, compact: bool):
+        self.compact = compact
+        self.rows: list[tuple[int, int, int]] = []
+
+        self.starts = array("Q") if compact else []
+        self.ends = array("Q") if compact else []
+        self.countries = array("H")
+
+    def add(self, start: int, end: int, country: int):
+        self.rows.append((start, end, country))
+
+    def build(self):
+        self.rows.sort()
+
+        starts = [row[0] for row in self.rows]
+        ends = [row[1] for row in self.rows]
+        self.starts = array("Q", starts) if self.compact else starts
+        self.ends = array("Q", ends) if self.compact else ends
+        self.countries = array("H", [row[2] for row in self.rows])
+
+        self.rows = []
+
+    def find(self, address: int) -> Optional[int]:
+        index = bisect.bisect_right(self.starts, address) - 1
+        if index >= 0 and address <= self.ends[index]:
+            return self.countries[index]
+        return None
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class GeoIPResolver:
+    """
+    Resolves client IPs to ISO country codes from a local range database.
+
+    GEOIP_DATABASE is either a MaxMind `.mmdb` file (needs the optional `maxminddb` package) or a
+    CSV, optionally gzipped, whose rows start with `range start, range end, country code`.
+    Addresses may be written as dotted/colon notation or as integers, as in the DB-IP and
+    IP2Location country exports. Addresses the database does not cover are looked up at
+    GEOIP_REMOTE_URL (an ipinfo.io style `{ip}` template returning `{"country": ...}`) when it
+    is set, and resolve to "Unknown" otherwise.
+    """
+
+    def __init__(self):
+        self.codes: list[str] = []
+        self.v4 = RangeTable(compact=True)
+        self.v6 = RangeTable(compact=False)
+        self.reader = None
+        self.client: Optional[httpx.AsyncClient] = None
+
+    def load_csv(self, path: str):
+        opener = gzip.open if path.endswith(".gz") else open
+        code_ids: dict[str, int] = {}
+        v4, v6 = RangeTable(compact=True), RangeTable(compact=False)
+
+        with opener(path, "rt", newline="", encoding="utf-8") as file:
+            for row in csv.reader(file):
+                if len(row) < 3:
+                    continue
+                try:
+                    start, end = parse_address(row[0]), parse_address(row[1])
+                except ValueError:
+                    # Header line or a malformed row.
+                    continue
+
+                code = row[2].strip().upper()
+                if not code or code == "-" or code == "ZZ":
+                    continue
+
+                country = code_ids.setdefault(code, len(code_ids))
+
+                # Combined exports list IPv4 ranges inside the IPv4-mapped IPv6 block.
+                if IPV4_MAPPED <= start and end <= IPV4_MAPPED + 0xFFFFFFFF:
+                    v4.add(start - IPV4_MAPPED, end - IPV4_MAPPED, country)
+                elif end <= 0xFFFFFFFF and ":" not in row[0]:
+                    v4.add(start, end, country)
+                else:
+                    v6.add(start, end, country)
+
+        v4.build()
+        v6.build()
+
+        self.codes = list(code_ids)
+        self.v4, self.v6 = v4, v6
+
+    def load(self, path: str):
+        if path.endswith(".mmdb"):
+            if maxminddb is None:
+                raise RuntimeError("Reading .mmdb files requires the maxminddb package")
+            self.reader = maxminddb.open_database(path)
+        else:
+            self.load_csv(path)
+
+    def lookup_local(self, ip: str) -> Optional[str]:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return UNKNOWN_COUNTRY
+
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+
+        if address.is_private or address.is_loopback or address.is_link_local or address.is_reserved:
+            return UNKNOWN_COUNTRY
+
+        if self.reader is not None:
+            record = self.reader.get(str(address)) or {}
+            return (record.get("country") or record.get("registered_country") or {}).get("iso_code")
+
+        table = self.v4 if address.version == 4 else self.v6
+        country = table.find(int(address))
+        return self.codes[country] if country is not None else None
+
+    async def lookup_remote(self, ip: str) -> Optional[str]:
+        """Raises httpx.HTTPError or ValueError when the lookup fails, rather than answering None."""
+        if not settings.GEOIP_REMOTE_URL:
+            return None
+
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                timeout=settings.GEOIP_REMOTE_TIMEOUT,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=20),
+            )
+
+        response = await self.client.get(settings.GEOIP_REMOTE_URL.format(ip=ip))
+        response.raise_for_status()
+        return response.json().get("country")
+
+    async def resolve(self, ip: str) -> str:
+        async def load() -> str:
+            return self.lookup_local(ip) or await self.lookup_remote(ip) or UNKNOWN_COUNTRY
+
+        try:
+            return await country_cache.get_or_load(ip, load)
+        except (httpx.HTTPError, ValueError) as e:
+            # Transient: remembered for GEOIP_FAILURE_CACHE_TTL only, not a full GEOIP_CACHE_TTL.
+            logger.debug(f"Remote GeoIP lookup for {ip} failed: {str(e)}")
+            country_cache.set(ip, UNKNOWN_COUNTRY, ttl=settings.GEOIP_FAILURE_CACHE_TTL)
+            return UNKNOWN_COUNTRY
+
+    async def start(self):
+        if not settings.GEOIP_DATABASE:
+            if settings.GEOIP_REMOTE_URL:
+                logger.info("GEOIP_DATABASE is not set, countries are resolved through GEOIP_REMOTE_URL only")
+            else:
+                logger.warning("Neither GEOIP_DATABASE nor GEOIP_REMOTE_URL is set, every country resolves to Unknown")
+            return
+
+        try:
+            await asyncio.to_thread(self.load, settings.GEOIP_DATABASE)
+        except Exception as e:
+            logger.critical(f"Could not load the GeoIP database {settings.GEOIP_DATABASE}: {str(e)}")
+            return
+
+        if self.reader is None:
+            logger.info(f"GeoIP database loaded: {len(self.v4)} IPv4 and {len(self.v6)} IPv6 ranges")
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+geoip = GeoIPResolver()
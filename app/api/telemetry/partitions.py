@@ -0,0 +1,350 @@
+"""
+Monthly partitions of `sessions`: created ahead of time, downsampled into daily aggregates and
+dropped after SESSION_RETENTION_MONTHS. Records outside the precreated months (clock skew, a
+failed maintenance run) land in the DEFAULT partition `sessions_default` and are moved into their
+month's partition when it is created. A `sessions` table from before partitioning is converted
+once, while the application is stopped, with
+
+    python -m app.api.telemetry.partitions
+
+The deploy workflow runs it between stopping the old container and starting the new one.
+"""
+from sqlalchemy import text, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.models import UserSession
+from app.config.database import Base, engine, AsyncSessionLocal
+from app.config.environment import settings
+from datetime import datetime, timezone
+from typing import Optional
+from loguru import logger
+import argparse
+import asyncio
+import re
+
+
+PARTITION_NAME = re.compile(r"^sessions_(\d{4})_(\d{2})$")
+DEFAULT_PARTITION = "sessions_default"
+
+# Serializes partition maintenance between workers.
+MAINTENANCE_LOCK = 7_204_318
+
+task: Optional[asyncio.Task] = None
+
+
+def month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def split_by_month(start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """Pieces of [start, end) that each stay within one calendar month (UTC), i.e. one partition."""
+    pieces = []
+    current = start
+
+    while True:
+        boundary = add_months(month_start(current), 1)
+        if end <= boundary:
+            pieces.append((current, end))
+            return pieces
+        pieces.append((current, boundary))
+        current = boundary
+
+
+def session_window(start: datetime, end: datetime) -> list:
+    """
+    Conditions for sessions overlapping [start, end). Rows never cross a month boundary, so the
+    `started_at` bounds are exact and let the planner skip partitions outside the window.
+    """
+    return [
+        UserSession.started_at >= month_start(start),
+        UserSession.started_at < end,
+        UserSession.period.op("&&")(func.tstzrange(start, end)),
+    ]
+
+
+async def existing_partitions(db: AsyncSession) -> dict[datetime, str]:
+    result = await db.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass('sessions')
+    """))
+
+    partitions = {}
+    for (name,) in result.all():
+        match = PARTITION_NAME.match(name)
+        if match:
+            partitions[datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)] = name
+    return partitions
+
+
+async def create_default_partition(db: AsyncSession):
+    await db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF sessions DEFAULT"))
+
+
+async def create_partition(db: AsyncSession, month: datetime) -> str:
+    """
+    Creates the partition of `month` and moves its rows out of the default partition, which
+    otherwise would make attaching the partition fail.
+    """
+    name = f"sessions_{month:%Y_%m}"
+    bounds = {"start": month, "end": add_months(month, 1)}
+
+    await db.execute(text(f"CREATE TABLE {name} (LIKE sessions INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await db.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE started_at >= :start AND started_at < :end
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), bounds)
+    await db.execute(text(
+        f"ALTER TABLE sessions ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+    return name
+
+
+async def create_partitions(db: AsyncSession, existing: dict[datetime, str]) -> list[str]:
+    """Partitions of the current month and the SESSION_PARTITIONS_AHEAD months after it."""
+    current = month_start(datetime.now(timezone.utc))
+    created = []
+
+    for offset in range(settings.SESSION_PARTITIONS_AHEAD + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            created.append(await create_partition(db, month))
+
+    return created
+
+
+async def expire_partitions(db: AsyncSession, existing: dict[datetime, str]) -> list[str]:
+    """Downsamples partitions older than SESSION_RETENTION_MONTHS into daily aggregates, then drops them."""
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -settings.SESSION_RETENTION_MONTHS)
+    dropped = []
+
+    for month, name in sorted(existing.items()):
+        if month >= cutoff:
+            continue
+
+        await db.execute(text(f"""
+            INSERT INTO session_daily_aggregates (day, country, sessions, users, duration_seconds)
+            SELECT
+                (started_at AT TIME ZONE 'UTC')::date,
+                country,
+                count(*),
+                count(DISTINCT "user"),
+                coalesce(sum(extract(epoch FROM upper(period) - lower(period))), 0)
+            FROM {name}
+            GROUP BY 1, 2
+            ON CONFLICT (day, country) DO UPDATE SET
+                sessions = excluded.sessions,
+                users = excluded.users,
+                duration_seconds = excluded.duration_seconds
+        """))
+        await db.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+
+    # Expired rows of months that never had a partition; added to, not replacing, their days.
+    expired_default = await db.execute(text(f"""
+        WITH expired AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE started_at < :cutoff RETURNING *
+        )
+        INSERT INTO session_daily_aggregates (day, country, sessions, users, duration_seconds)
+        SELECT
+            (started_at AT TIME ZONE 'UTC')::date,
+            country,
+            count(*),
+            count(DISTINCT "user"),
+            coalesce(sum(extract(epoch FROM upper(period) - lower(period))), 0)
+        FROM expired
+        GROUP BY 1, 2
+        ON CONFLICT (day, country) DO UPDATE SET
+            sessions = session_daily_aggregates.sessions + excluded.sessions,
+            users = session_daily_aggregates.users + excluded.users,
+            duration_seconds = session_daily_aggregates.duration_seconds + excluded.duration_seconds
+    """), {"cutoff": cutoff})
+    if expired_default.rowcount:
+        logger.info(f"Downsampled expired rows of {DEFAULT_PARTITION}")
+
+    return dropped
+
+
+async def is_unpartitioned(db: AsyncSession) -> bool:
+    """Whether `sessions` is still the plain table from before partitioning."""
+    relkind = await db.scalar(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('sessions')"))
+    return relkind == "r"
+
+
+async def convert_sessions_table() -> Optional[dict]:
+    """
+    Rebuilds an unpartitioned `sessions` table as the partitioned one, in a single transaction.
+
+    Sessions keep their ids; a session spanning a month boundary becomes one row per month under
+    the same id. Rows without a start (empty or unbounded `period`) cannot be placed in a partition
+    and are moved to `sessions_without_start`. Returns None when there is nothing to convert.
+    """
+    async with AsyncSessionLocal() as db:
+        if not await is_unpartitioned(db):
+            return None
+
+        await db.execute(text("LOCK TABLE sessions IN ACCESS EXCLUSIVE MODE"))
+        await db.execute(text("SET LOCAL timezone = 'UTC'"))
+
+        await db.execute(text("ALTER TABLE sessions RENAME TO sessions_unpartitioned"))
+        await db.execute(text("ALTER TABLE sessions_unpartitioned RENAME CONSTRAINT sessions_pkey TO sessions_unpartitioned_pkey"))
+        await db.execute(text("ALTER INDEX IF EXISTS ix_sessions_period_gist RENAME TO ix_sessions_unpartitioned_period_gist"))
+
+        await db.execute(text("""
+            CREATE TABLE sessions (
+                id integer NOT NULL DEFAULT nextval('sessions_id_seq'),
+                started_at timestamptz NOT NULL,
+                period tstzrange NOT NULL,
+                country varchar NOT NULL,
+                ip varchar NOT NULL,
+                "user" integer NOT NULL REFERENCES users (id),
+                PRIMARY KEY (id, started_at)
+            ) PARTITION BY RANGE (started_at)
+        """))
+        # Otherwise dropping the old table would drop the sequence with it.
+        await db.execute(text("ALTER SEQUENCE sessions_id_seq OWNED BY sessions.id"))
+        await create_default_partition(db)
+
+        months = await db.scalars(text("""
+            SELECT DISTINCT generate_series(
+                date_trunc('month', lower(period)),
+                greatest(lower(period), upper(period) - interval '1 microsecond'),
+                interval '1 month'
+            )
+            FROM sessions_unpartitioned
+            WHERE lower(period) IS NOT NULL
+        """))
+        for month in sorted({month_start(month) for month in months.all()}):
+            await create_partition(db, month)
+        await create_partitions(db, await existing_partitions(db))
+
+        copied = await db.execute(text("""
+            INSERT INTO sessions (id, started_at, period, country, ip, "user")
+            SELECT
+                s.id,
+                greatest(lower(s.period), m),
+                tstzrange(greatest(lower(s.period), m), least(upper(s.period), m + interval '1 month')),
+                s.country, s.ip, s."user"
+            FROM sessions_unpartitioned s,
+            LATERAL generate_series(
+                date_trunc('month', lower(s.period)),
+                greatest(lower(s.period), upper(s.period) - interval '1 microsecond'),
+                interval '1 month'
+            ) AS m
+            WHERE lower(s.period) IS NOT NULL
+        """))
+
+        without_start = await db.scalar(text("SELECT count(*) FROM sessions_unpartitioned WHERE lower(period) IS NULL"))
+        if without_start:
+            await db.execute(text("""
+                CREATE TABLE IF NOT EXISTS sessions_without_start
+                (LIKE sessions_unpartitioned INCLUDING DEFAULTS)
+            """))
+            await db.execute(text("""
+                INSERT INTO sessions_without_start
+                SELECT * FROM sessions_unpartitioned WHERE lower(period) IS NULL
+            """))
+
+        sessions = await db.scalar(text("SELECT count(*) FROM sessions_unpartitioned"))
+
+        await db.execute(text("DROP TABLE sessions_unpartitioned"))
+        await db.execute(text("CREATE INDEX ix_sessions_period_gist ON sessions USING gist (period)"))
+        await db.execute(text("CREATE INDEX ix_sessions_started_at ON sessions (started_at)"))
+        await db.execute(text("SELECT setval('sessions_id_seq', greatest((SELECT max(id) FROM sessions), 1))"))
+
+        await db.commit()
+
+    return {"sessions": sessions, "rows": copied.rowcount, "without_start": without_start}
+
+
+async def maintain_partitions():
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MAINTENANCE_LOCK})
+
+        await create_default_partition(db)
+        existing = await existing_partitions(db)
+        created = await create_partitions(db, existing)
+        dropped = await expire_partitions(db, existing)
+        stray = await db.scalar(text(f"SELECT count(*) FROM {DEFAULT_PARTITION}"))
+
+        await db.commit()
+
+    if stray:
+        logger.warning(f"{stray} session rows are outside the monthly partitions, in {DEFAULT_PARTITION}")
+
+    if created:
+        logger.info(f"Created session partitions: {', '.join(created)}")
+    if dropped:
+        logger.info(f"Downsampled and dropped session partitions: {', '.join(dropped)}")
+
+
+async def maintenance_worker():
+    while True:
+        await asyncio.sleep(settings.SESSION_MAINTENANCE_INTERVAL)
+
+        try:
+            await maintain_partitions()
+        except Exception as e:
+            logger.critical(f"Session partition maintenance failed: {str(e)}")
+
+
+async def start_partition_maintenance():
+    global task
+
+    async with AsyncSessionLocal() as db:
+        if await is_unpartitioned(db):
+            raise RuntimeError(
+                "The sessions table is not partitioned yet. Stop the application and convert it "
+                "with `python -m app.api.telemetry.partitions`."
+            )
+
+    # Partitions for the current month must exist before the first session record is written.
+    try:
+        await maintain_partitions()
+    except Exception as e:
+        logger.critical(f"Session partition maintenance failed: {str(e)}")
+
+    task = asyncio.create_task(maintenance_worker())
+
+
+async def stop_partition_maintenance():
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def main():
+    # Creates `sessions` (and the aggregates table) on a fresh database; an existing table is kept.
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    result = await convert_sessions_table()
+
+    if result is None:
+        logger.info("sessions is already partitioned")
+    else:
+        logger.info(f"Converted {result['sessions']} sessions into {result['rows']} partitioned rows")
+        if result["without_start"]:
+            logger.warning(
+                f"{result['without_start']} sessions had an empty or unbounded period and were "
+                f"moved to sessions_without_start"
+            )
+
+    await maintain_partitions()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    asyncio.run(main())
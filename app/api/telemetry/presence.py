@@ -0,0 +1,187 @@
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from app.config.models import WorkerPresence
+from app.config.database import AsyncSessionLocal
+from app.config.environment import settings
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from loguru import logger
+import asyncio
+import itertools
+import os
+import socket
+
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LocalPresenceBackend:
+    """Keeps snapshots in process memory: exact for a single worker, and a stand-in for tests."""
+
+    def __init__(self):
+        self.snapshots: dict[str, tuple[datetime, dict]] = {}
+
+    async def publish(self, worker_id: str, snapshot: dict):
+        self.snapshots[worker_id] = (datetime.now(timezone.utc), snapshot)
+
+    async def collect(self) -> list[dict]:
+        threshold = datetime.now(timezone.utc) - timedelta(seconds=settings.PRESENCE_STALE_AFTER)
+        return [snapshot for updated, snapshot in self.snapshots.values() if updated >= threshold]
+
+    async def remove(self, worker_id: str):
+        self.snapshots.pop(worker_id, None)
+
+
+class DatabasePresenceBackend:
+    """
+    Shares snapshots between workers through the `worker_presence` table. Each worker upserts
+    its own row; rows not refreshed within PRESENCE_STALE_AFTER seconds (a crashed worker) are ignored.
+    """
+
+    async def publish(self, worker_id: str, snapshot: dict):
+        query = insert(WorkerPresence).values(worker_id=worker_id, snapshot=snapshot, updatedAt=func.now())
+        query = query.on_conflict_do_update(
+            index_elements=[WorkerPresence.worker_id],
+            set_={"snapshot": query.excluded.snapshot, "updatedAt": query.excluded.updatedAt},
+        )
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(query)
+            await db.commit()
+
+    async def collect(self) -> list[dict]:
+        threshold = func.now() - timedelta(seconds=settings.PRESENCE_STALE_AFTER)
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(WorkerPresence.snapshot).where(WorkerPresence.updatedAt >= threshold))
+            return list(result.scalars().all())
+
+    async def remove(self, worker_id: str):
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(WorkerPresence).where(WorkerPresence.worker_id == worker_id))
+            await db.commit()
+
+
+def create_presence_backend():
+    if settings.PRESENCE_BACKEND == "local":
+        return LocalPresenceBackend()
+
+    if settings.PRESENCE_BACKEND == "database":
+        return DatabasePresenceBackend()
+
+    raise ValueError(f"Unknown presence backend: {settings.PRESENCE_BACKEND}")
+
+
+class PresenceRegistry:
+    """
+    Open telemetry websockets of this worker, merged with the other workers' through the backend.
+
+    Every worker publishes a snapshot of its connections, `{"users": {user id: {country: connections}}}`,
+    on changes and at least every PRESENCE_PUBLISH_INTERVAL seconds, then rebuilds `view` from all
+    fresh snapshots. Subscribers (the admin websocket) are woken up whenever `view` changes.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.connections: dict[int, tuple[int, str]] = {}
+        self.ids = itertools.count(1)
+
+        self.view: dict = self.aggregate([])
+        self.version = 0
+
+        self.changed = asyncio.Event()
+        self.updated = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+    def connect(self, user: int, country: str) -> int:
+        connection_id = next(self.ids)
+        self.connections[connection_id] = (user, country)
+        self.changed.set()
+        return connection_id
+
+    def disconnect(self, connection_id: int):
+        if self.connections.pop(connection_id, None) is not None:
+            self.changed.set()
+
+    def snapshot(self) -> dict:
+        users: dict[str, Counter] = defaultdict(Counter)
+        for user, country in self.connections.values():
+            users[str(user)][country] += 1
+        return {"users": {user: dict(per_country) for user, per_country in users.items()}}
+
+    @staticmethod
+    def aggregate(snapshots: list[dict]) -> dict:
+        users: Counter = Counter()
+        countries: dict[str, set] = defaultdict(set)
+
+        for snapshot in snapshots:
+            for user, per_country in snapshot["users"].items():
+                for country, connections in per_country.items():
+                    users[int(user)] += connections
+                    countries[country].add(int(user))
+
+        return {
+            "online_users": len(users),
+            "connections": sum(users.values()),
+            "countries": {country: len(members) for country, members in countries.items()},
+            "users": dict(users),
+            "workers": len(snapshots),
+            "updated_at": datetime.now(timezone.utc),
+        }
+
+    async def sync(self):
+        await self.backend.publish(WORKER_ID, self.snapshot())
+        view = self.aggregate(await self.backend.collect())
+
+        previous = {key: value for key, value in self.view.items() if key != "updated_at"}
+        current = {key: value for key, value in view.items() if key != "updated_at"}
+        self.view = view
+
+        if current != previous:
+            async with self.updated:
+                self.version += 1
+                self.updated.notify_all()
+
+    async def wait_for_update(self, version: int) -> int:
+        async with self.updated:
+            await self.updated.wait_for(lambda: self.version != version)
+            return self.version
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.changed.wait(), timeout=settings.PRESENCE_PUBLISH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+            self.changed.clear()
+
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Presence sync failed: {str(e)}")
+
+            # Coalesces reconnect storms into one publish per second.
+            await asyncio.sleep(1)
+
+    async def start(self):
+        self.backend = create_presence_backend()
+        self.task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+        if self.backend is None:
+            return
+
+        try:
+            await self.backend.remove(WORKER_ID)
+        except Exception as e:
+            logger.warning(f"Could not remove the presence snapshot of this worker: {str(e)}")
+
+
+presence = PresenceRegistry()
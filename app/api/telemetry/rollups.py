@@ -0,0 +1,141 @@
+"""
+Activity rollups: which users were active, and from which country, in every UTC minute, hour
+and day, plus HyperLogLog sketches of the hours and days. Rows are written together with the
+session records; existing sessions are loaded with
+
+    python -m app.api.telemetry.rollups [--since-days N]
+"""
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.models import ActivityRollup, UserSession
+from app.config.database import AsyncSessionLocal
+from app.config.environment import settings
+from app.api.telemetry.sketches import update_sketches
+from app.api.telemetry.partitions import session_window
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Iterator, Literal, Optional
+from loguru import logger
+import argparse
+import asyncio
+import time
+
+
+Bucket = Literal["minute", "hour", "day"]
+
+GRANULARITIES: dict[str, timedelta] = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+INSERT_BATCH_SIZE = 1000
+
+# Minute rows are pruned at most this often, from the session write path.
+PRUNE_INTERVAL = 3600
+
+last_pruned = 0.0
+
+
+def truncate(moment: datetime, granularity: str) -> datetime:
+    moment = moment.astimezone(timezone.utc).replace(second=0, microsecond=0)
+    if granularity in ("hour", "day"):
+        moment = moment.replace(minute=0)
+    if granularity == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def activity_buckets(start: datetime, end: datetime, granularity: str, not_before: Optional[datetime] = None) -> Iterator[datetime]:
+    """Buckets overlapping the half-open period [start, end), like `period && tstzrange(bucket, bucket + step)`."""
+    step = GRANULARITIES[granularity]
+    current = truncate(max(start, not_before) if not_before is not None else start, granularity)
+
+    while current < end:
+        yield current
+        current += step
+
+
+def rollup_rows(sessions: Iterable[tuple[datetime, datetime, int, str]]) -> list[dict]:
+    minutes_since = datetime.now(timezone.utc) - timedelta(days=settings.ROLLUP_MINUTE_RETENTION_DAYS)
+
+    rows = set()
+    for start, end, user, country in sessions:
+        for granularity in GRANULARITIES:
+            not_before = minutes_since if granularity == "minute" else None
+            for bucket in activity_buckets(start, end, granularity, not_before):
+                rows.add((granularity, bucket, user, country))
+
+    return [
+        {"granularity": granularity, "bucket": bucket, "user": user, "country": country}
+        for granularity, bucket, user, country in rows
+    ]
+
+
+async def record_activity(db: AsyncSession, sessions: Iterable[tuple[datetime, datetime, int, str]]) -> int:
+    """Adds the rollup rows and sketch updates of `(start, end, user, country)` sessions. Does not commit."""
+    rows = rollup_rows(sessions)
+
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        await db.execute(
+            insert(ActivityRollup)
+            .values(rows[start:start + INSERT_BATCH_SIZE])
+            .on_conflict_do_nothing()
+        )
+
+    await update_sketches(db, rows)
+
+    return len(rows)
+
+
+async def prune_minute_rollups(force: bool = False):
+    global last_pruned
+
+    if not force and time.monotonic() - last_pruned < PRUNE_INTERVAL:
+        return
+    last_pruned = time.monotonic()
+
+    threshold = datetime.now(timezone.utc) - timedelta(days=settings.ROLLUP_MINUTE_RETENTION_DAYS)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(ActivityRollup)
+            .where(ActivityRollup.granularity == "minute", ActivityRollup.bucket < threshold)
+        )
+        await db.commit()
+
+    if result.rowcount:
+        logger.info(f"Pruned {result.rowcount} minute rollups older than {threshold.isoformat()}")
+
+
+async def backfill_rollups(since_days: Optional[int] = None, batch_size: int = 5000) -> int:
+    query = select(UserSession.period, UserSession.user, UserSession.country).order_by(UserSession.started_at, UserSession.id)
+
+    if since_days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=since_days)
+        query = query.where(*session_window(since, datetime.now(timezone.utc)))
+
+    written = 0
+    sessions = 0
+
+    async with AsyncSessionLocal() as reader, AsyncSessionLocal() as writer:
+        result = await reader.stream(query.execution_options(yield_per=batch_size))
+
+        async for partition in result.partitions():
+            written += await record_activity(writer, [
+                (period.lower, period.upper, user, country) for period, user, country in partition
+            ])
+            await writer.commit()
+
+            sessions += len(partition)
+            logger.info(f"Backfilled rollups of {sessions} sessions")
+
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since-days", type=int, default=None, help="Only sessions overlapping the last N days")
+    args = parser.parse_args()
+
+    asyncio.run(backfill_rollups(args.since_days))
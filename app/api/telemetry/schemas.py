@@ -1,6 +1,11 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Literal
 from datetime import datetime
+from app.shared.utils import CountMode
+
+
+# "approximate" answers distinct-user counts from HyperLogLog sketches (about ±1.6% standard error).
+DistinctMode = Literal["exact", "approximate"]
 
 
 class IPInfo(BaseModel):
@@ -25,6 +30,9 @@ class UserFilter(BaseModel):
     is_suspended: Optional[bool] = None
     page: int = Field(1, ge=1)
     page_size: int = Field(20, ge=1, le=100)
+    pagination: Literal["offset", "cursor"] = "offset"
+    after: Optional[str] = None
+    count: CountMode = "exact"
 
 
 class UserView(BaseModel):
@@ -40,10 +48,11 @@ class UserView(BaseModel):
 
 class UserPaginationInfo(BaseModel):
     users: List[UserView]
-    current_page: int
+    current_page: Optional[int]
     page_size: int
-    total_users: int
-    total_pages: int
+    total_users: Optional[int]
+    total_pages: Optional[int]
+    next_cursor: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -51,4 +60,48 @@ class UserPaginationInfo(BaseModel):
 
 class UserSuspend(BaseModel):
     status: bool
-    id: int
\ No newline at end of file
+    id: int
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    ttl: float
+    hits: int
+    misses: int
+    evictions: int
+    coalesced: int
+    stale_hits: int
+
+
+class SessionBufferStats(BaseModel):
+    depth: int
+    capacity: int
+    pending: int
+    enqueued: int
+    written: int
+    dropped: int
+    flushes: int
+    failed_flushes: int
+    last_flush_ms: float
+    max_flush_ms: float
+    avg_flush_ms: float
+
+
+class ConnectionStats(BaseModel):
+    active: int
+    limit: int
+    peak: int
+    accepted: int
+    rejected: int
+    heartbeat_timeouts: int
+    idle_timeouts: int
+
+
+class LivePresence(BaseModel):
+    online_users: int
+    connections: int
+    countries: Dict[str, int]
+    users: Dict[int, int]
+    workers: int
+    updated_at: datetime
@@ -1,20 +1,37 @@
 from app.api.telemetry.schemas import (
     IPInfo, NumericalTelemetry, UserPaginationInfo,
-    UserFilter, UserView, UserSuspend
+    UserFilter, UserView, UserSuspend, DistinctMode
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import (
     func, select, distinct,
     and_
 )
-from app.config.models import UserSession, Course, User 
-from datetime import datetime, timedelta
-from app.shared.utils import paginate
-from app.api.auth.utils import get_user_by_id
+from app.config.models import Course, User, ActivityRollup
+from app.config.database import AsyncSessionLocal
+from app.config.environment import settings
+from app.shared.cache import TTLCache
+from app.api.telemetry.buffer import session_buffer
+from app.api.telemetry.geoip import geoip
+from app.api.telemetry.sketches import approximate_active_users
+from app.api.telemetry.rollups import truncate
+from datetime import datetime, timedelta, timezone
+from app.shared.utils import paginate, paginate_keyset, stream_export, ExportFormat
+from app.api.auth.utils import get_user_by_id, invalidate_cached_user
 from app.api.auth.errors import NonExistentUser
 from app.api.telemetry.errors import CannotSuspendAnotherAdmin
+from app.api.telemetry.utils import build_user_filters
+from pydantic import TypeAdapter
+from typing import List
 
-import httpx
+
+user_list_adapter = TypeAdapter(List[UserView])
+user_pagination_adapter = TypeAdapter(UserPaginationInfo)
+
+numerical_cache = TTLCache(
+    "numerical_telemetry", maxsize=2,
+    ttl=settings.NUMERICAL_CACHE_TTL, stale=settings.NUMERICAL_CACHE_STALE
+)
 
 
 async def try_suspend_user(db: AsyncSession, parameters: UserSuspend):
@@ -32,73 +49,114 @@ async def try_suspend_user(db: AsyncSession, parameters: UserSuspend):
 
     await db.commit()
 
+    invalidate_cached_user(user.email)
 
 
-async def filter_users(db: AsyncSession, parameters: UserFilter) -> UserPaginationInfo:
-    query = select(User)
 
-    conditions = [c for c in [
-        User.name == parameters.name if parameters.name is not None else None,
-        User.surname == parameters.surname if parameters.surname is not None else None,
-        User.email == parameters.email if parameters.email is not None else None,
-        User.is_suspended == parameters.is_suspended if parameters.is_suspended is not None else None,
-    ] if c is not None]
+async def filter_users(db: AsyncSession, parameters: UserFilter) -> bytes:
+    """Returns the `UserPaginationInfo` page already encoded as JSON."""
+    query = select(User.id, User.name, User.surname, User.email, User.is_suspended)
+
+    conditions = build_user_filters(parameters)
 
     if conditions:
         query = query.where(and_(*conditions))
 
-    users, total_users, total_pages = await paginate(
-        db=db,
-        base_query=query,
-        page=parameters.page,
-        page_size=parameters.page_size
-    )
-
-    return UserPaginationInfo(
-        users=[UserView.from_orm(user) for user in users],
-        current_page=parameters.page,
+    if parameters.pagination == "cursor" or parameters.after:
+        users, next_cursor, total_users = await paginate_keyset(
+            db=db,
+            base_query=query,
+            key_columns=[User.id],
+            after=parameters.after,
+            page_size=parameters.page_size,
+            count=parameters.count,
+            as_mappings=True
+        )
+        current_page = None
+        total_pages = (total_users + parameters.page_size - 1) // parameters.page_size if total_users is not None else None
+    else:
+        users, total_users, total_pages = await paginate(
+            db=db,
+            base_query=query,
+            page=parameters.page,
+            page_size=parameters.page_size,
+            count=parameters.count,
+            as_mappings=True
+        )
+        current_page = parameters.page
+        next_cursor = None
+
+    page = UserPaginationInfo(
+        users=user_list_adapter.validate_python([dict(user) for user in users]),
+        current_page=current_page,
         page_size=len(users),
         total_users=total_users,
-        total_pages=total_pages
+        total_pages=total_pages,
+        next_cursor=next_cursor
     )
 
+    return user_pagination_adapter.dump_json(page)
+
+
+def export_users(parameters: UserFilter, format: ExportFormat):
+    query = (
+        select(User.id, User.name, User.surname, User.email, User.is_suspended)
+        .where(*build_user_filters(parameters))
+        .order_by(User.id)
+    )
+    return stream_export(query, format)
+
 
 async def fetch_ip_info(ip: str) -> IPInfo:
-    async with httpx.AsyncClient() as client:
-        response = await client.get(f"https://ipinfo.io/{ip}/json")
-        response.raise_for_status()
-        data = response.json()
+    return IPInfo(country=await geoip.resolve(ip))
 
-    return IPInfo(**data)
 
+async def save_record(start: datetime, end: datetime, ip: str, country: str, user: int):
+    await session_buffer.put(start=start, end=end, ip=ip, country=country, user=user)
 
-async def save_record(db: AsyncSession, start: datetime, end: datetime, ip: str, country: str, user: int):
-    db_record = UserSession(period=(start, end), country=country, ip=ip, user=user)
-    db.add(db_record)
-    await db.commit()
 
+async def compute_numerical_telemetry(db: AsyncSession, mode: DistinctMode = "exact") -> NumericalTelemetry:
+    """All three metrics in one round trip; active users over the last 30 days, at hour resolution."""
+    now = datetime.now(timezone.utc)
+    thirty_days_ago = now - timedelta(days=30)
 
-async def get_numerical_telemetry(db: AsyncSession) -> NumericalTelemetry:
-    courses_count_query = select(func.count()).select_from(Course)
-    result = await db.execute(courses_count_query)
-    courses_count = result.scalar_one()
+    columns = [
+        select(func.count()).select_from(Course).scalar_subquery().label("total_courses"),
+        select(func.count()).select_from(User).scalar_subquery().label("total_users"),
+    ]
 
-    users_count_query = select(func.count()).select_from(User)
-    result = await db.execute(users_count_query)
-    users_count = result.scalar_one()
-    
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+    if mode == "exact":
+        columns.append(
+            select(func.count(distinct(ActivityRollup.user)))
+            .where(
+                ActivityRollup.granularity == "hour",
+                ActivityRollup.bucket >= truncate(thirty_days_ago, "hour")
+            )
+            .scalar_subquery()
+            .label("active_users")
+        )
 
-    active_users_query = (
-        select(func.count(distinct(UserSession.user)))
-        .where(UserSession.period.op('&&')(func.tstzrange(thirty_days_ago, func.now())))
-    )
+    row = (await db.execute(select(*columns))).mappings().one()
 
-    result = await db.execute(active_users_query)
-    active_users_count = result.scalar_one()
+    if mode == "approximate":
+        active_users_count = await approximate_active_users(db, thirty_days_ago, now)
+    else:
+        active_users_count = row["active_users"]
 
     return NumericalTelemetry(
-        total_users=users_count,
+        total_users=row["total_users"],
         active_users=active_users_count,
-        total_courses=courses_count
-    )
\ No newline at end of file
+        total_courses=row["total_courses"]
+    )
+
+
+async def get_numerical_telemetry(mode: DistinctMode = "exact") -> NumericalTelemetry:
+    """
+    Served from `numerical_cache`: polling dashboards share one load per NUMERICAL_CACHE_TTL,
+    and get the previous value while it is refreshed in the background.
+    """
+    async def load() -> NumericalTelemetry:
+        async with AsyncSessionLocal() as db:
+            return await compute_numerical_telemetry(db, mode)
+
+    return await numerical_cache.get_or_load(mode, load)
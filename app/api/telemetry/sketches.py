@@ -0,0 +1,123 @@
+from sqlalchemy import select, update, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.models import ActivitySketch
+from app.shared.hll import HyperLogLog
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+ALL_COUNTRIES = "*"
+
+SKETCH_GRANULARITIES = ("hour", "day")
+
+KEY_BATCH_SIZE = 500
+
+
+async def update_sketches(db: AsyncSession, rollup_rows: list[dict]):
+    """
+    Adds the users of hour/day rollup rows to the sketches of their bucket, per country and for
+    all countries. Rows are locked in key order, so concurrent flushes merge instead of overwriting.
+    Does not commit.
+    """
+    users: dict[tuple, set] = defaultdict(set)
+    for row in rollup_rows:
+        if row["granularity"] in SKETCH_GRANULARITIES:
+            users[(row["granularity"], row["bucket"], row["country"])].add(row["user"])
+            users[(row["granularity"], row["bucket"], ALL_COUNTRIES)].add(row["user"])
+
+    keys = sorted(users)
+    empty = HyperLogLog().to_bytes()
+    key_columns = tuple_(ActivitySketch.granularity, ActivitySketch.bucket, ActivitySketch.country)
+
+    for start in range(0, len(keys), KEY_BATCH_SIZE):
+        batch = keys[start:start + KEY_BATCH_SIZE]
+
+        await db.execute(
+            insert(ActivitySketch)
+            .values([
+                {"granularity": granularity, "bucket": bucket, "country": country, "sketch": empty}
+                for granularity, bucket, country in batch
+            ])
+            .on_conflict_do_nothing()
+        )
+
+        result = await db.execute(
+            select(ActivitySketch.granularity, ActivitySketch.bucket, ActivitySketch.country, ActivitySketch.sketch)
+            .where(key_columns.in_(batch))
+            .order_by(ActivitySketch.granularity, ActivitySketch.bucket, ActivitySketch.country)
+            .with_for_update()
+        )
+
+        changed = []
+        for granularity, bucket, country, data in result.all():
+            sketch = HyperLogLog.from_bytes(data)
+            for user in users[(granularity, bucket, country)]:
+                sketch.add(user)
+
+            encoded = sketch.to_bytes()
+            if encoded != data:
+                changed.append({"granularity": granularity, "bucket": bucket, "country": country, "sketch": encoded})
+
+        if changed:
+            await db.execute(update(ActivitySketch), changed)
+
+
+def window_buckets(start: datetime, end: datetime) -> list[tuple[str, datetime]]:
+    """Whole days inside [start, end) plus the hours at its edges, at hour resolution."""
+    buckets = []
+    current = start.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    while current < end:
+        if current.hour == 0 and current + timedelta(days=1) <= end:
+            buckets.append(("day", current))
+            current += timedelta(days=1)
+        else:
+            buckets.append(("hour", current))
+            current += timedelta(hours=1)
+
+    return buckets
+
+
+async def merged_sketches(db: AsyncSession, start: datetime, end: datetime, country: Optional[str]) -> dict[str, HyperLogLog]:
+    """Union sketches of [start, end) keyed by country; `country=None` returns every country but "*"."""
+    keys = window_buckets(start, end)
+    merged: dict[str, HyperLogLog] = defaultdict(HyperLogLog)
+
+    for offset in range(0, len(keys), KEY_BATCH_SIZE):
+        query = (
+            select(ActivitySketch.country, ActivitySketch.sketch)
+            .where(tuple_(ActivitySketch.granularity, ActivitySketch.bucket).in_(keys[offset:offset + KEY_BATCH_SIZE]))
+        )
+        query = query.where(
+            ActivitySketch.country == country if country is not None else ActivitySketch.country != ALL_COUNTRIES
+        )
+
+        for row_country, data in (await db.execute(query)).all():
+            merged[row_country].merge_bytes(data)
+
+    return merged
+
+
+async def approximate_active_users(db: AsyncSession, start: datetime, end: datetime) -> int:
+    merged = await merged_sketches(db, start, end, ALL_COUNTRIES)
+    return merged[ALL_COUNTRIES].count() if ALL_COUNTRIES in merged else 0
+
+
+async def approximate_countries(db: AsyncSession, start: datetime, end: datetime) -> dict[str, int]:
+    merged = await merged_sketches(db, start, end, None)
+    return {country: sketch.count() for country, sketch in merged.items()}
+
+
+async def approximate_buckets(db: AsyncSession, granularity: str, start: datetime, end: datetime) -> dict[datetime, int]:
+    """Estimated distinct users of every `granularity` bucket between start and end (inclusive)."""
+    result = await db.execute(
+        select(ActivitySketch.bucket, ActivitySketch.sketch)
+        .where(
+            ActivitySketch.granularity == granularity,
+            ActivitySketch.country == ALL_COUNTRIES,
+            ActivitySketch.bucket.between(start, end)
+        )
+    )
+    return {bucket: HyperLogLog.from_bytes(data).count() for bucket, data in result.all()}
@@ -1,47 +1,71 @@
-from sqlalchemy import text
+from sqlalchemy import select, func, distinct
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta, timezone
+from app.config.models import User, ActivityRollup
+from app.config.environment import settings
+from app.api.telemetry.schemas import UserFilter, DistinctMode
+from app.api.telemetry.errors import WindowTooLarge
+from app.api.telemetry.rollups import Bucket, GRANULARITIES, truncate
+from app.api.telemetry.sketches import approximate_buckets, approximate_countries
 
 
-async def active_users_distribution(db: AsyncSession, since_days: int) -> dict:
-    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
-    start_time = now - timedelta(days=since_days)
+def build_user_filters(parameters: UserFilter) -> list:
+    return [c for c in [
+        User.name == parameters.name if parameters.name is not None else None,
+        User.surname == parameters.surname if parameters.surname is not None else None,
+        User.email == parameters.email if parameters.email is not None else None,
+        User.is_suspended == parameters.is_suspended if parameters.is_suspended is not None else None,
+    ] if c is not None]
 
-    hourly_query = text("""
-        WITH hours AS (
-            SELECT generate_series(
-                :start_time,
-                :end_time,
-                interval '1 hour'
-            ) AS hour_start
+
+def fill_buckets(counts: dict[datetime, int], start: datetime, end: datetime, step: timedelta) -> dict[datetime, int]:
+    distribution = {}
+    moment = start
+    while moment <= end:
+        distribution[moment] = counts.get(moment, 0)
+        moment += step
+    return distribution
+
+
+async def active_users_distribution(db: AsyncSession, since_days: int, bucket: Bucket = "hour", mode: DistinctMode = "exact") -> dict:
+    if bucket == "minute" and since_days > settings.ROLLUP_MINUTE_RETENTION_DAYS:
+        raise WindowTooLarge
+
+    now = truncate(datetime.now(timezone.utc), bucket)
+    start_time = truncate(now - timedelta(days=since_days), bucket)
+    step = GRANULARITIES[bucket]
+
+    # Minutes are not sketched; their windows are short enough to count exactly.
+    if mode == "approximate" and bucket != "minute":
+        counts = await approximate_buckets(db, bucket, start_time, now)
+        return {
+            "distribution": fill_buckets(counts, start_time, now, step),
+            "countries": await approximate_countries(db, start_time, now + step)
+        }
+
+    bucket_query = (
+        select(ActivityRollup.bucket, func.count(distinct(ActivityRollup.user)))
+        .where(
+            ActivityRollup.granularity == bucket,
+            ActivityRollup.bucket.between(start_time, now)
+        )
+        .group_by(ActivityRollup.bucket)
+    )
+    counts = dict((await db.execute(bucket_query)).all())
+
+    # Distinct users over the whole window; minute rows would only add volume.
+    country_granularity = "day" if bucket == "day" else "hour"
+    country_query = (
+        select(ActivityRollup.country, func.count(distinct(ActivityRollup.user)))
+        .where(
+            ActivityRollup.granularity == country_granularity,
+            ActivityRollup.bucket.between(truncate(start_time, country_granularity), now)
         )
-        SELECT
-            hours.hour_start,
-            COUNT(DISTINCT sessions."user") AS active_users
-        FROM hours
-        LEFT JOIN sessions
-        ON sessions.period && tstzrange(hours.hour_start, hours.hour_start + interval '1 hour')
-        GROUP BY hours.hour_start
-        ORDER BY hours.hour_start;
-    """)
-
-    hourly_result = await db.execute(hourly_query, {"start_time": start_time, "end_time": now})
-    hourly_data = {row.hour_start: row.active_users for row in hourly_result.fetchall()}
-
-    country_query = text("""
-        SELECT
-            country,
-            COUNT(DISTINCT "user") AS active_users
-        FROM sessions
-        WHERE period && tstzrange(:start_time, :end_time)
-        GROUP BY country
-    """)
-
-    # + 1 hour since current time is truncated (e.g. 09:01:54 -> 09:00:00)
-    country_result = await db.execute(country_query, {"start_time": start_time, "end_time": now + timedelta(hours=1)})
-    country_data = {row.country: row.active_users for row in country_result.fetchall()}
+        .group_by(ActivityRollup.country)
+    )
+    countries = dict((await db.execute(country_query)).all())
 
     return {
-        "distribution": hourly_data,
-        "countries": country_data
-    }
\ No newline at end of file
+        "distribution": fill_buckets(counts, start_time, now, step),
+        "countries": countries
+    }
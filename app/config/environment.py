@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 
 class Settings(BaseSettings):
@@ -15,6 +16,74 @@ class Settings(BaseSettings):
     FRONTEND_URL: str
     BACKEND_URL: str
 
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL: int = 60
+
+    COURSE_CACHE_SIZE: int = 256
+    COURSE_CACHE_TTL: int = 30
+    FACET_CACHE_SIZE: int = 128
+    FACET_CACHE_TTL: int = 300
+
+    CATALOG_ENGINE_ENABLED: bool = False
+    CATALOG_REFRESH_INTERVAL: int = 30
+
+    INSIGHTS_SOURCES: list[str] = []
+    INSIGHTS_INGEST_INTERVAL: int = 0
+    INSIGHTS_CRAWL_CONCURRENCY: int = 8
+    INSIGHTS_MAX_ARTICLES_PER_SOURCE: int = 50
+    INSIGHTS_SNAPSHOT_TTL: int = 300
+    INSIGHTS_WATERMARK_TTL: int = 5
+
+    HASHING_WORKERS: int = 2
+    HASHING_QUEUE_LIMIT: int = 64
+
+    EMAIL_TRANSPORT: str = "unosend"
+    EMAIL_API_URL: str = "https://www.unosend.co/api/v1/emails"
+    EMAIL_WORKERS: int = 4
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BASE_SECONDS: int = 30
+    EMAIL_RETRY_MAX_SECONDS: int = 3600
+    EMAIL_SEND_TIMEOUT: int = 60
+    EMAIL_POLL_INTERVAL: int = 10
+    EMAIL_DEDUP_WINDOW: int = 60
+
+    SESSION_BUFFER_LIMIT: int = 10000
+    SESSION_BUFFER_PUT_TIMEOUT: float = 1.0
+    SESSION_FLUSH_SIZE: int = 500
+    SESSION_FLUSH_INTERVAL: float = 2.0
+    SESSION_FLUSH_MAX_BACKOFF: float = 60.0
+
+    ROLLUP_MINUTE_RETENTION_DAYS: int = 7
+
+    SESSION_RETENTION_MONTHS: int = 13
+    SESSION_PARTITIONS_AHEAD: int = 2
+    SESSION_MAINTENANCE_INTERVAL: int = 86400
+
+    NUMERICAL_CACHE_TTL: int = 10
+    NUMERICAL_CACHE_STALE: int = 60
+
+    GEOIP_DATABASE: Optional[str] = None
+    GEOIP_CACHE_SIZE: int = 50000
+    GEOIP_CACHE_TTL: int = 86400
+    # Failed or timed-out remote lookups are retried after this many seconds.
+    GEOIP_FAILURE_CACHE_TTL: int = 60
+    # Unset, addresses outside GEOIP_DATABASE resolve to "Unknown".
+    GEOIP_REMOTE_URL: Optional[str] = "https://ipinfo.io/{ip}/json"
+    GEOIP_REMOTE_TIMEOUT: float = 2.0
+
+    PRESENCE_BACKEND: str = "local"
+    PRESENCE_PUBLISH_INTERVAL: float = 5.0
+    PRESENCE_STALE_AFTER: int = 30
+
+    WS_MAX_CONNECTIONS: int = 20000
+    # Protocol-level pings, answered by every websocket client (see app/worker.py).
+    WS_PROTOCOL_PING_INTERVAL: float = 20.0
+    WS_PROTOCOL_PING_TIMEOUT: float = 20.0
+    # Text "ping"/"pong" heartbeat; off until clients answer "pong".
+    WS_PING_INTERVAL: float = 0.0
+    WS_PING_TIMEOUT: float = 20.0
+    WS_IDLE_TIMEOUT: float = 0.0
+
     class Config:
         env_file = ".env"
 
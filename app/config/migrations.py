@@ -0,0 +1,67 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from loguru import logger
+from app.config.models import COURSE_SEARCH_VECTOR, UNKNOWN_ARTICLE_DATE
+
+
+# Trigram indexes let `ILIKE '%term%'` filters use an index instead of scanning `courses`.
+TRIGRAM_COLUMNS = ["title_ua", "title_en", "description_ua", "description_en", "category", "speaker", "link", "image"]
+
+# Articles written outside the application (raw SQL, scripts) still get a `published_at`: the
+# free-form date if Postgres can read it, else UNKNOWN_ARTICLE_DATE as on every other write path.
+# Writes through the ORM parse more formats first (app/api/insights/utils.py).
+FILL_ARTICLE_PUBLISHED_AT = f"""
+CREATE OR REPLACE FUNCTION articles_fill_published_at() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.date IS DISTINCT FROM OLD.date
+       AND NEW.published_at IS NOT DISTINCT FROM OLD.published_at THEN
+        NEW.published_at := NULL;
+    END IF;
+
+    IF NEW.published_at IS NULL THEN
+        BEGIN
+            NEW.published_at := NEW.date::timestamptz;
+        EXCEPTION WHEN others THEN
+            NEW.published_at := '{UNKNOWN_ARTICLE_DATE.isoformat()}'::timestamptz;
+        END;
+    END IF;
+
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# Idempotent DDL for objects that `create_all` does not add to tables that already exist.
+STATEMENTS = [
+    'CREATE INDEX IF NOT EXISTS ix_courses_created_id ON courses ("createdAt", id)',
+    f"ALTER TABLE courses ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ({COURSE_SEARCH_VECTOR}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_courses_search_vector ON courses USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS ix_courses_tags_gin ON courses USING gin (tags)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    *[
+        f"CREATE INDEX IF NOT EXISTS ix_courses_{column}_trgm ON courses USING gin ({column} gin_trgm_ops)"
+        for column in TRIGRAM_COLUMNS
+    ],
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS published_at timestamptz",
+    "CREATE INDEX IF NOT EXISTS ix_articles_lang_published ON articles (lang, published_at, id)",
+    FILL_ARTICLE_PUBLISHED_AT,
+    "DROP TRIGGER IF EXISTS articles_fill_published_at ON articles",
+    "CREATE TRIGGER articles_fill_published_at BEFORE INSERT OR UPDATE OF date, published_at ON articles "
+    "FOR EACH ROW EXECUTE FUNCTION articles_fill_published_at()",
+    "ALTER TABLE articles ADD COLUMN IF NOT EXISTS content_hash varchar",
+    "CREATE INDEX IF NOT EXISTS ix_articles_content_hash ON articles (content_hash)",
+    # Fails (and is logged) while duplicate URLs exist; ingestion upserts need it.
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_articles_url ON articles (url)",
+    "ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS template varchar",
+    "ALTER TABLE email_outbox ADD COLUMN IF NOT EXISTS template_args jsonb",
+    "ALTER TABLE email_outbox ALTER COLUMN html DROP NOT NULL",
+]
+
+
+async def apply_migrations(engine: AsyncEngine):
+    for statement in STATEMENTS:
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(text(statement))
+        except Exception as e:
+            logger.warning(f"Migration failed: {statement}\n{str(e)}")
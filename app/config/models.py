@@ -1,11 +1,28 @@
 from sqlalchemy import (
     Column, Integer, String, 
     Float, Boolean, DateTime, 
-    Text, Index, ForeignKey
+    Text, Index, ForeignKey, text,
+    Computed, LargeBinary, Date
 )
+from sqlalchemy.orm import deferred
 from app.config.database import Base
-from datetime import datetime
-from sqlalchemy.dialects.postgresql import ARRAY, TSTZRANGE
+from datetime import datetime, timezone
+from sqlalchemy.dialects.postgresql import ARRAY, TSTZRANGE, TSVECTOR, JSONB
+
+
+# `published_at` of articles whose date cannot be parsed, on every write path: they sort after
+# every dated article.
+UNKNOWN_ARTICLE_DATE = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Postgres ships no Ukrainian stemmer, so Ukrainian columns are indexed with the 'simple' configuration.
+COURSE_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title_en, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(title_ua, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description_en, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description_ua, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(category, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(speaker, '')), 'C')"
+)
 
 
 class Article(Base):
@@ -22,6 +39,17 @@ class Article(Base):
     lang = Column(String, nullable=False)
     category = Column(String, nullable=False)
 
+    # Parsed from the free-form `date`, so listings can be ordered by recency in the database.
+    published_at = Column(DateTime(timezone=True), nullable=True)
+
+    # sha256 of the normalized content; ingestion skips copies of an article under another URL.
+    content_hash = Column(String, nullable=True, index=True)
+
+    __table_args__ = (
+        Index("ix_articles_lang_published", "lang", "published_at", "id"),
+        Index("ux_articles_url", "url", unique=True),
+    )
+
 
 class User(Base):
     __tablename__ = "users"
@@ -62,11 +90,24 @@ class Course(Base):
     createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
     updatedAt = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    search_vector = deferred(Column(TSVECTOR, Computed(COURSE_SEARCH_VECTOR, persisted=True)))
+
+    __table_args__ = (
+        Index("ix_courses_created_id", "createdAt", "id"),
+        Index("ix_courses_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_courses_tags_gin", "tags", postgresql_using="gin"),
+    )
+
 
 class UserSession(Base):
+    """
+    Partitioned by month of `started_at`. Sessions spanning a month boundary are stored as one
+    row per month, so a row never leaves its partition's month.
+    """
     __tablename__ = "sessions"
 
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    started_at = Column(DateTime(timezone=True), primary_key=True)
     period = Column(TSTZRANGE, nullable=False)
     country = Column(String, nullable=False)
     ip = Column(String, nullable=False)
@@ -78,4 +119,82 @@ class UserSession(Base):
             "period",
             postgresql_using="gist",
         ),
-    )
\ No newline at end of file
+        Index("ix_sessions_started_at", "started_at"),
+        {"postgresql_partition_by": "RANGE (started_at)"},
+    )
+
+
+class SessionDailyAggregate(Base):
+    """What is kept of sessions after their partition passes SESSION_RETENTION_MONTHS."""
+    __tablename__ = "session_daily_aggregates"
+
+    day = Column(Date, primary_key=True)
+    country = Column(String, primary_key=True)
+    sessions = Column(Integer, nullable=False)
+    users = Column(Integer, nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+
+
+class ActivityRollup(Base):
+    """One row per user and country active during a UTC minute, hour or day, kept in step with `sessions`."""
+    __tablename__ = "activity_rollups"
+
+    granularity = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    user = Column(Integer, primary_key=True)
+    country = Column(String, primary_key=True)
+
+
+class ActivitySketch(Base):
+    """HyperLogLog sketch of the users active in a UTC hour or day, per country and for all countries ("*")."""
+    __tablename__ = "activity_sketches"
+
+    granularity = Column(String, primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    country = Column(String, primary_key=True)
+    sketch = Column(LargeBinary, nullable=False)
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+
+    # Rendered when the letter is sent, so links minted for it are fresh on every attempt.
+    template = Column(String, nullable=True)
+    template_args = Column(JSONB, nullable=True)
+    # Letters queued before templates were stored carry their rendered body instead.
+    html = Column(Text, nullable=True)
+
+    # Identical pending letters (e.g. repeated /auth/resend) share a key and are queued once.
+    dedup_key = Column(String, nullable=True)
+
+    status = Column(String, default="pending", nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(Text, nullable=True)
+
+    createdAt = Column(DateTime, default=datetime.utcnow, nullable=False)
+    sentAt = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ux_email_outbox_dedup_active",
+            "dedup_key",
+            unique=True,
+            postgresql_where=text("status IN ('pending', 'sending')"),
+        ),
+        Index("ix_email_outbox_due", "status", "next_attempt_at"),
+    )
+
+
+class WorkerPresence(Base):
+    """Latest presence snapshot published by each application worker (database presence backend)."""
+    __tablename__ = "worker_presence"
+
+    worker_id = Column(String, primary_key=True)
+    snapshot = Column(JSONB, nullable=False)
+    updatedAt = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,222 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, event
+from sqlalchemy.dialects.postgresql import insert
+from app.config.models import EmailOutbox
+from app.config.database import AsyncSessionLocal
+from app.config.environment import settings
+from app.config.template_storage import templates
+from app.mail.transports import create_transport, PermanentDeliveryError
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+from loguru import logger
+import asyncio
+import random
+
+
+ACTIVE_STATUSES = ("pending", "sending")
+
+transport = None
+workers: list[asyncio.Task] = []
+wakeup = asyncio.Event()
+
+# Per-template hooks that complete the stored arguments right before rendering, e.g. with a
+# freshly minted token. Called as `provider(recipient, template_args)`.
+context_providers: dict[str, Callable[[str, dict], dict]] = {}
+
+
+async def enqueue_email(
+    db: AsyncSession,
+    recipient: str,
+    template_name: str,
+    template_args: dict,
+    subject: str,
+    dedup_key: Optional[str] = None
+) -> bool:
+    """
+    Adds a letter to the outbox in the caller's transaction; workers are woken once it commits.
+    The template is rendered at send time. Returns False when an identical letter is already
+    queued or was sent within EMAIL_DEDUP_WINDOW seconds.
+    """
+    if dedup_key is not None:
+        recently_sent = await db.scalar(
+            select(EmailOutbox.id)
+            .where(
+                EmailOutbox.dedup_key == dedup_key,
+                EmailOutbox.status == "sent",
+                EmailOutbox.sentAt >= datetime.utcnow() - timedelta(seconds=settings.EMAIL_DEDUP_WINDOW)
+            )
+            .limit(1)
+        )
+        if recently_sent is not None:
+            logger.debug(f"Letter '{dedup_key}' was sent recently, skipping")
+            return False
+
+    logger.debug(f"Queueing letter f'{template_name}.html' with arguments: {template_args}")
+
+    now = datetime.utcnow()
+    query = (
+        insert(EmailOutbox)
+        .values(
+            recipient=recipient,
+            subject=subject,
+            template=template_name,
+            template_args=template_args,
+            dedup_key=dedup_key,
+            status="pending",
+            attempts=0,
+            next_attempt_at=now,
+            createdAt=now,
+        )
+        .on_conflict_do_nothing(
+            index_elements=[EmailOutbox.dedup_key],
+            index_where=EmailOutbox.status.in_(ACTIVE_STATUSES),
+        )
+        .returning(EmailOutbox.id)
+    )
+
+    result = await db.execute(query)
+
+    queued = result.scalar() is not None
+    if queued:
+        event.listen(db.sync_session, "after_commit", lambda session: wakeup.set(), once=True)
+    else:
+        logger.debug(f"Letter '{dedup_key}' is already queued, skipping")
+
+    return queued
+
+
+def retry_delay(attempts: int) -> timedelta:
+    delay = min(settings.EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.EMAIL_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+async def claim_letter() -> Optional[EmailOutbox]:
+    """
+    Takes the oldest due letter and leases it for EMAIL_SEND_TIMEOUT seconds.
+    A letter whose worker died mid-send becomes due again once the lease expires.
+    """
+    async with AsyncSessionLocal() as db:
+        now = datetime.utcnow()
+
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status.in_(ACTIVE_STATUSES), EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+
+        result = await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == due)
+            .values(
+                status="sending",
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=settings.EMAIL_SEND_TIMEOUT),
+            )
+            .returning(EmailOutbox)
+            .execution_options(synchronize_session=False)
+        )
+        letter = result.scalars().first()
+        await db.commit()
+
+        return letter
+
+
+async def finish_letter(letter: EmailOutbox, error: Optional[Exception] = None):
+    if error is None:
+        values = {"status": "sent", "sentAt": datetime.utcnow(), "last_error": None}
+    elif isinstance(error, PermanentDeliveryError) or letter.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        logger.critical(f"Giving up on letter {letter.id} to {letter.recipient}: {str(error)}")
+        values = {"status": "failed", "last_error": str(error)}
+    else:
+        logger.warning(f"Letter {letter.id} failed (attempt {letter.attempts}), retrying: {str(error)}")
+        values = {
+            "status": "pending",
+            "next_attempt_at": datetime.utcnow() + retry_delay(letter.attempts),
+            "last_error": str(error),
+        }
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == letter.id)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+def render_letter(letter: EmailOutbox) -> str:
+    if letter.template is None:
+        return letter.html
+
+    template_args = dict(letter.template_args or {})
+    provider = context_providers.get(letter.template)
+    if provider is not None:
+        template_args = provider(letter.recipient, template_args)
+
+    return templates[letter.template].render(**template_args)
+
+
+async def deliver(letter: EmailOutbox):
+    try:
+        message = {
+            "from": settings.EMAIL,
+            "to": [letter.recipient],
+            "subject": letter.subject,
+            "html": render_letter(letter),
+        }
+        await asyncio.wait_for(transport.send(message), timeout=settings.EMAIL_SEND_TIMEOUT)
+    except Exception as e:
+        await finish_letter(letter, e)
+    else:
+        await finish_letter(letter)
+
+
+async def email_worker(number: int):
+    logger.debug(f"Email worker {number} started")
+
+    while True:
+        wakeup.clear()
+
+        try:
+            letter = await claim_letter()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.critical(f"Email worker {number} could not claim a letter: {str(e)}")
+            letter = None
+
+        if letter is None:
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=settings.EMAIL_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            await deliver(letter)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.critical(f"Email worker {number} could not record delivery of letter {letter.id}: {str(e)}")
+
+
+async def start_email_workers():
+    global transport
+
+    transport = create_transport()
+    workers.extend(asyncio.create_task(email_worker(i)) for i in range(settings.EMAIL_WORKERS))
+
+
+async def stop_email_workers():
+    for worker in workers:
+        worker.cancel()
+
+    await asyncio.gather(*workers, return_exceptions=True)
+    workers.clear()
+
+    if transport is not None:
+        await transport.close()
@@ -0,0 +1,57 @@
+from app.config.environment import settings
+from loguru import logger
+import httpx
+
+
+class PermanentDeliveryError(Exception):
+    pass
+
+
+class UnosendTransport:
+    """Posts letters to the Unosend API (or any compatible stand-in) over one pooled client."""
+
+    def __init__(self, url: str, api_key: str, timeout: float = 30.0):
+        self.url = url
+        self.client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.EMAIL_WORKERS,
+                max_keepalive_connections=settings.EMAIL_WORKERS,
+            ),
+        )
+
+    async def send(self, message: dict):
+        response = await self.client.post(self.url, json=message)
+
+        if 400 <= response.status_code < 500 and response.status_code != 429:
+            raise PermanentDeliveryError(f"{response.status_code}: {response.text}")
+
+        response.raise_for_status()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class MemoryTransport:
+    """Keeps letters in memory instead of sending them. Useful locally and in tests."""
+
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def send(self, message: dict):
+        logger.debug(f"Letter to {message['to']} stored in memory: {message['subject']}")
+        self.sent.append(message)
+
+    async def close(self):
+        pass
+
+
+def create_transport():
+    if settings.EMAIL_TRANSPORT == "memory":
+        return MemoryTransport()
+
+    if settings.EMAIL_TRANSPORT == "unosend":
+        return UnosendTransport(settings.EMAIL_API_URL, settings.UNOSEND_API_KEY)
+
+    raise ValueError(f"Unknown email transport: {settings.EMAIL_TRANSPORT}")
@@ -3,13 +3,23 @@ from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from loguru import logger
-from app.config.database import Base, engine
+from app.config.database import Base, engine, AsyncSessionLocal
+from app.config.migrations import apply_migrations
 from jinja2 import Environment, FileSystemLoader
 
 from app.api.auth.routes import auth_router
 from app.api.courses.routes import course_router
 from app.api.insights.routes import insights_router
 from app.api.telemetry.routes import telemetry_router
+from app.api.auth.utils import calibrate_hashing, hashing_executor
+from app.mail.services import start_email_workers, stop_email_workers
+from app.api.courses.catalog import catalog
+from app.api.insights.utils import backfill_article_dates
+from app.api.telemetry.partitions import start_partition_maintenance, stop_partition_maintenance
+from app.api.telemetry.buffer import session_buffer
+from app.api.telemetry.geoip import geoip
+from app.api.telemetry.presence import presence
+from app.api.insights.ingestion import start_ingestion_worker, stop_ingestion_worker
 
 import os
 import app.config.template_storage as template_storage
@@ -23,6 +33,11 @@ async def startup_init():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+    await apply_migrations(engine)
+
+    async with AsyncSessionLocal() as db:
+        await backfill_article_dates(db)
+
     template_dir = os.path.join(os.path.dirname(__file__), "email_templates")
 
     template_storage.env = Environment(
@@ -44,6 +59,87 @@ async def create_tables():
         await conn.run_sync(Base.metadata.create_all)
 
 
+@app.on_event("startup")
+async def calibrate_password_hashing():
+    await calibrate_hashing()
+
+
+@app.on_event("shutdown")
+async def shutdown_hashing():
+    hashing_executor.shutdown(wait=False)
+
+
+@app.on_event("startup")
+async def startup_email_workers():
+    await start_email_workers()
+
+
+@app.on_event("shutdown")
+async def shutdown_email_workers():
+    await stop_email_workers()
+
+
+@app.on_event("startup")
+async def startup_catalog():
+    if settings.CATALOG_ENGINE_ENABLED:
+        await catalog.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_catalog():
+    await catalog.stop()
+
+
+@app.on_event("startup")
+async def startup_partition_maintenance():
+    await start_partition_maintenance()
+
+
+@app.on_event("shutdown")
+async def shutdown_partition_maintenance():
+    await stop_partition_maintenance()
+
+
+@app.on_event("startup")
+async def startup_session_buffer():
+    await session_buffer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_session_buffer():
+    await session_buffer.stop()
+
+
+@app.on_event("startup")
+async def startup_geoip():
+    await geoip.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_geoip():
+    await geoip.stop()
+
+
+@app.on_event("startup")
+async def startup_presence():
+    await presence.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_presence():
+    await presence.stop()
+
+
+@app.on_event("startup")
+async def startup_ingestion():
+    await start_ingestion_worker()
+
+
+@app.on_event("shutdown")
+async def shutdown_ingestion():
+    await stop_ingestion_worker()
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.critical(f"Critical uncaught error: {str(exc)}")
@@ -56,6 +152,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Awaitable, Callable, Optional
+import asyncio
+import time
+
+
+caches: dict[str, "TTLCache"] = {}
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded in-process LRU cache with per-entry time-to-live.
+
+    With `stale` > 0, `get_or_load` keeps answering with an expired value for up to `stale`
+    more seconds while a single background load refreshes it (stale-while-revalidate).
+
+    Registered by name in `caches`, so its counters can be reported by the admin endpoints.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, stale: float = 0):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale = stale
+
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self._refreshes: set[asyncio.Task] = set()
+
+        # Bumped on invalidation, so loads that started earlier do not store stale results.
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+
+        caches[name] = self
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        now = time.monotonic()
+
+        if expires_at <= now:
+            # Expired entries stay around for stale-while-revalidate reads.
+            if expires_at + self.stale <= now:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Returns the cached value or awaits `loader()` to produce it.
+        Concurrent misses for the same key share a single load.
+        """
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            if self.stale:
+                entry = self._data.get(key)
+                if entry is not None:
+                    self.stale_hits += 1
+                    if key not in self._pending:
+                        self.refresh(key, loader)
+                    return entry[1]
+
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Retry only if the leading request was cancelled, not this one.
+                if not pending.cancelled():
+                    raise
+
+        return await self._load(key, loader, self._register(key))
+
+    def refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        """Reloads `key` in the background; the loader must not depend on the caller's request scope."""
+        task = asyncio.create_task(self._load(key, loader, self._register(key)))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+        # A failed refresh leaves the stale value in place until its window runs out.
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+
+    def _register(self, key: Hashable) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        return future
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], future: asyncio.Future) -> Any:
+        generation = self.generation
+
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+        future.set_result(value)
+        if generation == self.generation:
+            self.set(key, value)
+
+        return value
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+        # Later misses start a fresh load instead of joining one that may have read old data.
+        self._pending.pop(key, None)
+        self.generation += 1
+
+    def clear(self):
+        self._data.clear()
+        self._pending.clear()
+        self.generation += 1
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+        }
@@ -0,0 +1,5 @@
+class InvalidCursor(Exception):
+    message = {
+        "en": "This pagination cursor is invalid.",
+        "ua": "Цей курсор пагінації недійсний."
+    }
@@ -0,0 +1,125 @@
+from typing import Any, Iterable, Optional
+import hashlib
+import math
+import struct
+
+
+PRECISION = 12
+REGISTERS = 1 << PRECISION
+
+# Standard error of the estimate: about 1.6% with 4096 registers.
+RELATIVE_ERROR = 1.04 / math.sqrt(REGISTERS)
+
+MAX_RANK = 64 - PRECISION + 1
+
+# Encodings: sparse `(index, rank)` pairs while they are shorter than the raw registers.
+SPARSE = 1
+DENSE = 2
+
+
+def hash64(value: Any) -> int:
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+def sigma(x: float) -> float:
+    if x == 1:
+        return math.inf
+
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def tau(x: float) -> float:
+    if x == 0 or x == 1:
+        return 0.0
+
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct counter (p=12, 64-bit blake2b hashes). Sketches of different buckets
+    merge by register-wise maximum, so a window's estimate is the estimate of its buckets' union.
+    """
+
+    def __init__(self, registers: Optional[bytearray] = None):
+        self.registers = registers if registers is not None else bytearray(REGISTERS)
+
+    @classmethod
+    def of(cls, values: Iterable[Any]) -> "HyperLogLog":
+        sketch = cls()
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def add(self, value: Any):
+        hashed = hash64(value)
+        index = hashed >> (64 - PRECISION)
+        rest = hashed & ((1 << (64 - PRECISION)) - 1)
+        rank = (64 - PRECISION) - rest.bit_length() + 1
+
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def merge_bytes(self, data: bytes) -> "HyperLogLog":
+        """Merges an encoded sketch without decoding it first; sparse sketches touch only their pairs."""
+        if data[0] == SPARSE:
+            registers = self.registers
+            for index, rank in struct.iter_unpack(">HB", data[1:]):
+                if rank > registers[index]:
+                    registers[index] = rank
+        elif data[0] == DENSE:
+            self.registers = bytearray(map(max, self.registers, data[1:]))
+        else:
+            raise ValueError(f"Unknown sketch encoding: {data[0]}")
+
+        return self
+
+    def count(self) -> int:
+        """
+        Ertl's improved raw estimator ("New cardinality estimation algorithms for HyperLogLog
+        sketches", 2017). Unlike the classic estimate with a switch to linear counting, it has no
+        bias bump around 2.5 * REGISTERS and needs no empirical correction tables.
+        """
+        if not any(self.registers):
+            return 0
+
+        counts = [self.registers.count(rank) for rank in range(MAX_RANK + 1)]
+
+        z = REGISTERS * tau(1 - counts[MAX_RANK] / REGISTERS)
+        for rank in range(MAX_RANK - 1, 0, -1):
+            z = 0.5 * (z + counts[rank])
+        z += REGISTERS * sigma(counts[0] / REGISTERS)
+
+        return round(REGISTERS * REGISTERS / (2 * math.log(2) * z))
+
+    def to_bytes(self) -> bytes:
+        filled = [(index, rank) for index, rank in enumerate(self.registers) if rank]
+
+        if len(filled) * 3 < REGISTERS:
+            return bytes([SPARSE]) + b"".join(struct.pack(">HB", index, rank) for index, rank in filled)
+
+        return bytes([DENSE]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        if data[0] == DENSE:
+            return cls(bytearray(data[1:]))
+        return cls().merge_bytes(data)
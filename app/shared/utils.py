@@ -1,26 +1,191 @@
-from typing import TypeVar, Sequence
-from sqlalchemy import select, func
+from typing import TypeVar, Sequence, Literal, Optional, Any, Mapping, AsyncIterator
+from sqlalchemy import select, func, tuple_, BigInteger
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.sql import Select
+from app.shared.errors import InvalidCursor
+from app.config.database import AsyncSessionLocal
+from datetime import datetime
+from pydantic_core import to_json
+import base64
+import json
+import csv
+import io
 
 T = TypeVar("T")
 
+CountMode = Literal["exact", "estimate", "none"]
+
+ExportFormat = Literal["ndjson", "csv"]
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    dumped = [{"dt": value.isoformat()} if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(dumped, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def cursor_value_matches(value: Any, column) -> bool:
+    """Whether `value` can be compared with `column` in Postgres without a type error."""
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value is not None
+
+    if python_type is datetime:
+        timezone_aware = bool(getattr(column.type, "timezone", False))
+        return isinstance(value, datetime) and (value.tzinfo is not None) == timezone_aware
+
+    if python_type is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    if python_type is int:
+        bits = 64 if isinstance(column.type, BigInteger) else 32
+        return isinstance(value, int) and not isinstance(value, bool) and -2**(bits - 1) <= value < 2**(bits - 1)
+
+    return isinstance(value, python_type)
+
+
+def decode_cursor(cursor: str, key_columns: Sequence[Any]) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        values = [
+            datetime.fromisoformat(value["dt"]) if isinstance(value, dict) else value
+            for value in values
+        ]
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor
+
+    if not isinstance(values, list) or len(values) != len(key_columns):
+        raise InvalidCursor
+
+    # Crafted cursors must not reach the database as mistyped parameters.
+    if not all(cursor_value_matches(value, column) for value, column in zip(values, key_columns)):
+        raise InvalidCursor
+
+    return values
+
+
+async def estimate_count(db: AsyncSession, base_query: Select) -> int:
+    """Row estimate from the planner, without executing the query."""
+    conn = await db.connection()
+    compiled = base_query.order_by(None).compile(
+        dialect=conn.dialect,
+        compile_kwargs={"literal_binds": True}
+    )
+
+    result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_rows(db: AsyncSession, base_query: Select, count: CountMode) -> Optional[int]:
+    if count == "none":
+        return None
+
+    if count == "estimate":
+        return await estimate_count(db, base_query)
+
+    count_query = select(func.count()).select_from(base_query.order_by(None).subquery())
+    total_count = await db.scalar(count_query)
+    return total_count or 0
+
+
 async def paginate(
     db: AsyncSession,
     base_query: Select,
     page: int,
     page_size: int,
-) -> tuple[Sequence[T], int, int]:
-    
-    count_query = select(func.count()).select_from(base_query.order_by(None).subquery())
-    total_count = await db.scalar(count_query)
-    total_count = total_count or 0
+    count: CountMode = "exact",
+    as_mappings: bool = False,
+) -> tuple[Sequence[T], Optional[int], Optional[int]]:
+
+    total_count = await count_rows(db, base_query, count)
 
-    total_pages = (total_count + page_size - 1) // page_size
+    total_pages = (total_count + page_size - 1) // page_size if total_count is not None else None
 
     paginated_query = (base_query.offset((page - 1) * page_size).limit(page_size))
 
     result = await db.execute(paginated_query)
-    items = result.scalars().all()
+    items = result.mappings().all() if as_mappings else result.scalars().all()
 
     return items, total_count, total_pages
+
+
+async def paginate_keyset(
+    db: AsyncSession,
+    base_query: Select,
+    key_columns: list,
+    after: Optional[str],
+    page_size: int,
+    count: CountMode = "exact",
+    descending: bool = False,
+    as_mappings: bool = False,
+) -> tuple[Sequence[T], Optional[str], Optional[int]]:
+    """
+    Cursor pagination over `key_columns` (the sort key followed by a unique column, usually id).
+    `after` is the opaque cursor returned as `next_cursor` by the previous page.
+    With `as_mappings` the query must select the key columns under their own names.
+    """
+
+    total_count = await count_rows(db, base_query, count)
+
+    key = tuple_(*key_columns)
+    query = base_query.order_by(*[column.desc() if descending else column.asc() for column in key_columns])
+
+    if after:
+        values = decode_cursor(after, key_columns)
+        query = query.where(key < tuple_(*values) if descending else key > tuple_(*values))
+
+    result = await db.execute(query.limit(page_size + 1))
+    items = result.mappings().all() if as_mappings else result.scalars().all()
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([
+            last[column.key] if isinstance(last, Mapping) else getattr(last, column.key)
+            for column in key_columns
+        ])
+
+    return items, next_cursor, total_count
+
+
+def csv_value(value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        return ";".join(str(item) for item in value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def stream_export(query: Select, format: ExportFormat, batch_size: int = 500) -> AsyncIterator[bytes]:
+    """
+    Streams the rows of `query` as NDJSON lines or CSV through a server-side cursor, one
+    `batch_size` partition at a time, so memory stays flat regardless of the row count.
+    Uses its own session because the response outlives the request's dependencies.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(result.keys())
+            yield buffer.getvalue().encode()
+
+            async for partition in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([csv_value(value) for value in row] for row in partition)
+                yield buffer.getvalue().encode()
+            return
+
+        async for partition in result.mappings().partitions():
+            yield b"".join(to_json(dict(row)) + b"\n" for row in partition)
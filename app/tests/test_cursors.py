@@ -0,0 +1,40 @@
+from app.shared.utils import encode_cursor, decode_cursor
+from app.shared.errors import InvalidCursor
+from app.config.models import Article, Course, User
+from datetime import datetime, timezone
+import base64
+import json
+import pytest
+
+
+def raw_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    published = datetime(2026, 1, 29, 5, tzinfo=timezone.utc)
+    created = datetime(2026, 1, 29, 5)
+
+    assert decode_cursor(encode_cursor([published, 7]), [Article.published_at, Article.id]) == [published, 7]
+    assert decode_cursor(encode_cursor([created, 7]), [Course.createdAt, Course.id]) == [created, 7]
+    assert decode_cursor(encode_cursor([42]), [User.id]) == [42]
+
+
+@pytest.mark.parametrize("cursor, columns", [
+    (raw_cursor(["x", "y"]), [Article.published_at, Article.id]),
+    (raw_cursor([{"dt": "2026-01-29T05:00:00+00:00"}, "7"]), [Article.published_at, Article.id]),
+    # Naive timestamp for a timestamptz column and the other way round.
+    (raw_cursor([{"dt": "2026-01-29T05:00:00"}, 7]), [Article.published_at, Article.id]),
+    (raw_cursor([{"dt": "2026-01-29T05:00:00+00:00"}, 7]), [Course.createdAt, Course.id]),
+    (raw_cursor(["42"]), [User.id]),
+    (raw_cursor([True]), [User.id]),
+    (raw_cursor([None]), [User.id]),
+    (raw_cursor([2**40]), [User.id]),
+    (raw_cursor([1, 2]), [User.id]),
+    (raw_cursor({"id": 1}), [User.id]),
+    (raw_cursor([{"dt": 5}]), [Course.createdAt]),
+    ("not base64 !", [User.id]),
+])
+def test_rejects_mistyped_cursors(cursor, columns):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, columns)
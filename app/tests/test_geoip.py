@@ -0,0 +1,97 @@
+from app.api.telemetry.geoip import GeoIPResolver, country_cache, UNKNOWN_COUNTRY
+from app.config.environment import settings
+from pathlib import Path
+import asyncio
+import gzip
+import shutil
+import httpx
+import pytest
+
+
+FIXTURE = Path(__file__).parent / "fixtures" / "geoip.csv"
+
+
+@pytest.fixture
+def resolver() -> GeoIPResolver:
+    resolver = GeoIPResolver()
+    resolver.load(str(FIXTURE))
+    return resolver
+
+
+def test_loads_ranges_by_version(resolver):
+    # 8.8.8.0/24, the integer row and the IPv4-mapped row are IPv4; "ZZ" and malformed rows are skipped.
+    assert len(resolver.v4) == 3
+    assert len(resolver.v6) == 1
+
+
+@pytest.mark.parametrize("ip, country", [
+    ("8.8.8.8", "US"),
+    ("8.8.8.0", "US"),
+    ("8.8.8.255", "US"),
+    ("1.1.1.1", "AU"),
+    ("5.5.5.5", "DE"),
+    ("::ffff:8.8.8.8", "US"),
+    ("::ffff:5.5.5.5", "DE"),
+    ("2a00:1450:4001:80b::200e", "IE"),
+])
+def test_lookup_covered_addresses(resolver, ip, country):
+    assert resolver.lookup_local(ip) == country
+
+
+@pytest.mark.parametrize("ip", ["8.8.9.1", "9.9.9.9", "2a01::1"])
+def test_lookup_uncovered_addresses(resolver, ip):
+    assert resolver.lookup_local(ip) is None
+
+
+@pytest.mark.parametrize("ip", ["10.0.0.1", "192.168.1.10", "127.0.0.1", "::1", "fe80::1", "::ffff:10.0.0.1", "testclient"])
+def test_private_and_invalid_addresses_are_unknown(resolver, ip):
+    assert resolver.lookup_local(ip) == UNKNOWN_COUNTRY
+
+
+def test_uncovered_addresses_resolve_to_unknown_without_remote_lookup(resolver, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_REMOTE_URL", None)
+    country_cache.clear()
+
+    async def scenario():
+        return await resolver.resolve("9.9.9.9"), await resolver.resolve("8.8.8.8")
+
+    assert asyncio.run(scenario()) == (UNKNOWN_COUNTRY, "US")
+    assert resolver.client is None
+
+
+def test_loads_gzipped_csv(tmp_path):
+    path = tmp_path / "geoip.csv.gz"
+    with open(FIXTURE, "rb") as source, gzip.open(path, "wb") as target:
+        shutil.copyfileobj(source, target)
+
+    resolver = GeoIPResolver()
+    resolver.load(str(path))
+
+    assert resolver.lookup_local("1.1.1.1") == "AU"
+
+
+def test_failed_remote_lookups_are_cached_briefly(resolver, monkeypatch):
+    monkeypatch.setattr(settings, "GEOIP_REMOTE_URL", "http://geoip.test/{ip}")
+    monkeypatch.setattr(settings, "GEOIP_FAILURE_CACHE_TTL", 0)
+    country_cache.clear()
+
+    online = False
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not online:
+            raise httpx.ConnectTimeout("timed out", request=request)
+        return httpx.Response(200, json={"country": "NL"})
+
+    resolver.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    async def scenario():
+        nonlocal online
+        failed = await resolver.resolve("9.9.9.9")
+        online = True
+        recovered = await resolver.resolve("9.9.9.9")
+        online = False
+        cached = await resolver.resolve("9.9.9.9")
+        await resolver.stop()
+        return failed, recovered, cached
+
+    assert asyncio.run(scenario()) == (UNKNOWN_COUNTRY, "NL", "NL")
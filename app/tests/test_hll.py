@@ -0,0 +1,78 @@
+from app.shared.hll import HyperLogLog, RELATIVE_ERROR, REGISTERS, SPARSE, DENSE
+import pytest
+
+
+@pytest.mark.parametrize("cardinality", [10, 1000, 5000, 10000, 20000, 100000])
+def test_estimate_is_within_the_error_bound(cardinality):
+    errors = [
+        (HyperLogLog.of(f"{sketch}-{value}" for value in range(cardinality)).count() - cardinality) / cardinality
+        for sketch in range(8)
+    ]
+
+    # Hashing is deterministic, so these do not flake. The mean of 8 sketches catches bias, e.g.
+    # around 2.5 * REGISTERS (10000) where estimators switch; single sketches stay within 4 standard
+    # errors.
+    assert abs(sum(errors) / len(errors)) <= RELATIVE_ERROR
+    assert max(abs(error) for error in errors) <= 4 * RELATIVE_ERROR
+
+
+def test_duplicates_do_not_count():
+    sketch = HyperLogLog.of(value % 500 for value in range(10000))
+
+    assert abs(sketch.count() - 500) <= 3 * RELATIVE_ERROR * 500
+
+
+def test_empty_sketch_counts_zero():
+    assert HyperLogLog().count() == 0
+    assert HyperLogLog.from_bytes(HyperLogLog().to_bytes()).count() == 0
+
+
+def test_encoding_switches_from_sparse_to_dense():
+    small = HyperLogLog.of(range(100))
+    large = HyperLogLog.of(range(100000))
+
+    assert small.to_bytes()[0] == SPARSE
+    assert len(small.to_bytes()) < REGISTERS
+    assert large.to_bytes()[0] == DENSE
+    assert len(large.to_bytes()) == REGISTERS + 1
+
+    # The switch happens once sparse pairs would no longer be shorter than the registers.
+    values = 0
+    sketch = HyperLogLog()
+    while sketch.to_bytes()[0] == SPARSE:
+        sketch.add(values)
+        values += 1
+    filled = REGISTERS - sketch.registers.count(0)
+    assert filled * 3 >= REGISTERS
+    assert (filled - 1) * 3 < REGISTERS
+
+
+@pytest.mark.parametrize("cardinality", [0, 50, 5000])
+def test_round_trip(cardinality):
+    sketch = HyperLogLog.of(range(cardinality))
+    decoded = HyperLogLog.from_bytes(sketch.to_bytes())
+
+    assert decoded.registers == sketch.registers
+    assert decoded.count() == sketch.count()
+
+
+@pytest.mark.parametrize("left, right", [(100, 200), (100, 50000), (30000, 60000)])
+def test_merge_is_the_sketch_of_the_union(left, right):
+    first = [f"a-{value}" for value in range(left)]
+    second = [f"a-{value}" for value in range(left // 2, left // 2 + right)]
+    union = HyperLogLog.of(first + second)
+
+    merged = HyperLogLog.of(first).merge(HyperLogLog.of(second))
+    assert merged.registers == union.registers
+
+    # Either encoding of the other side merges without decoding to the same registers.
+    merged_bytes = HyperLogLog.of(first).merge_bytes(HyperLogLog.of(second).to_bytes())
+    assert merged_bytes.registers == union.registers
+
+    distinct = len(set(first) | set(second))
+    assert abs(merged.count() - distinct) <= 3 * RELATIVE_ERROR * distinct
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(bytes([7]) + bytes(REGISTERS))
@@ -0,0 +1,167 @@
+from app.api.insights.ingestion import parse_article, extract_article_links, crawl, run_ingestion
+from app.api.insights.schemas import NewsSummary
+from app.config.database import Base, engine, AsyncSessionLocal
+from app.config.migrations import apply_migrations
+from app.config.models import Article, UNKNOWN_ARTICLE_DATE
+from sqlalchemy import select, delete
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+from pathlib import Path
+import asyncio
+import shutil
+import threading
+import httpx
+import pytest
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "insights"
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def site(tmp_path):
+    """Serves a copy of the fixture site on localhost; tests may edit files under `site.root`."""
+    root = tmp_path / "site"
+    shutil.copytree(FIXTURES, root)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    server.root = root
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def read(name: str) -> str:
+    return (FIXTURES / "news" / name).read_text()
+
+
+def test_extract_article_links():
+    links = extract_article_links(read("index.html"), "http://site.test/news/", limit=10)
+
+    assert links == [
+        "http://site.test/news/rates.html",
+        "http://site.test/news/rates-syndicated.html",
+        "http://site.test/news/wallets.html",
+        "http://site.test/news/inline-image.html",
+    ]
+
+
+def test_parse_article():
+    article = parse_article(read("rates.html"), "http://site.test/news/rates.html")
+
+    assert article["title"] == "Central bank holds rates"
+    assert article["image"] == "http://site.test/images/rates.jpg"
+    assert article["thumbnail"] == "http://site.test/images/rates.jpg"
+    assert article["lang"] == "EN"
+    assert article["category"] == "Markets"
+    assert article["published_at"].isoformat() == "2026-01-29T05:00:00+00:00"
+    assert article["excerpt"] == "Rates stay unchanged for another quarter."
+
+
+def test_unparseable_and_missing_dates():
+    published_time = '<meta property="article:published_time" content="2026-01-29T05:00:00+00:00">'
+
+    unparseable = parse_article(
+        read("rates.html").replace(published_time, '<meta property="article:published_time" content="soon">'),
+        "http://site.test/news/rates.html",
+    )
+    assert unparseable["date"] == "soon"
+    assert unparseable["published_at"] == UNKNOWN_ARTICLE_DATE
+
+    undated = parse_article(read("rates.html").replace(published_time, ""), "http://site.test/news/rates.html")
+    assert undated["published_at"] > UNKNOWN_ARTICLE_DATE
+    assert undated["date"] == undated["published_at"].isoformat()
+
+
+def test_parse_article_skips_unusable_images():
+    wallets = parse_article(read("wallets.html"), "http://site.test/news/wallets.html")
+
+    assert wallets["image"] == "https://cdn.example.com/wallets.png"
+    assert wallets["lang"] == "UA"
+    assert wallets["published_at"].date().isoformat() == "2026-01-29"
+
+    assert parse_article(read("inline-image.html"), "http://site.test/news/inline-image.html") is None
+
+
+def test_syndicated_copies_share_a_content_hash():
+    original = parse_article(read("rates.html"), "http://site.test/news/rates.html")
+    copy = parse_article(read("rates-syndicated.html"), "http://site.test/news/rates-syndicated.html")
+
+    assert original["content_hash"] == copy["content_hash"]
+
+
+def test_crawl_fixture_site(site):
+    async def scenario():
+        async with httpx.AsyncClient() as client:
+            return await crawl(client, [f"{site.url}/news/index.html"])
+
+    articles = asyncio.run(scenario())
+
+    assert sorted(article["url"].rsplit("/", 1)[1] for article in articles) == [
+        "rates-syndicated.html", "rates.html", "wallets.html"
+    ]
+    for article in articles:
+        NewsSummary.model_validate({**article, "id": 1})
+
+
+async def stored_articles(site_url: str) -> dict[str, Article]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(Article).where(Article.url.startswith(site_url)))
+        return {article.url.rsplit("/", 1)[1]: article for article in result.scalars().all()}
+
+
+def test_ingestion_upserts_by_url_and_skips_copies(site, database_url):
+    source = f"{site.url}/news/index.html"
+
+    async def scenario():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await apply_migrations(engine)
+
+        # The fixture site gets a new port on every run, so rows of earlier runs are not under
+        # site.url; stored copies of its articles would suppress them.
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Article))
+            # The same story on another site is not a copy of this site's article.
+            db.add(Article(**parse_article(read("rates.html"), "http://elsewhere.test/news/rates.html")))
+            await db.commit()
+
+        try:
+            async with httpx.AsyncClient() as client:
+                first = await run_ingestion([source], client)
+                stored = await stored_articles(site.url)
+
+                unchanged = await run_ingestion([source], client)
+
+                page = site.root / "news" / "rates.html"
+                page.write_text(page.read_text().replace("on Thursday", "on Friday"))
+                changed = await run_ingestion([source], client)
+                updated = await stored_articles(site.url)
+
+            return first, stored, unchanged, changed, updated
+        finally:
+            await engine.dispose()
+
+    first, stored, unchanged, changed, updated = asyncio.run(scenario())
+
+    # The syndicated copy has the same content hash as the original and is not stored; the
+    # story stored under elsewhere.test does not count.
+    assert first == 2
+    assert sorted(stored) == ["rates.html", "wallets.html"]
+
+    assert unchanged == 0
+
+    # ON CONFLICT (url) updates the existing row in place.
+    assert changed >= 1
+    assert updated["rates.html"].id == stored["rates.html"].id
+    assert "on Friday" in updated["rates.html"].content
+    assert updated["rates.html"].content_hash != stored["rates.html"].content_hash
@@ -0,0 +1,211 @@
+from app.config.environment import settings
+from app.config.database import Base, engine, AsyncSessionLocal
+from app.config.migrations import apply_migrations
+from app.config.models import EmailOutbox
+from app.config.template_storage import templates
+from app.mail import services
+from app.mail.services import enqueue_email, claim_letter, deliver, finish_letter
+from app.mail.transports import MemoryTransport, PermanentDeliveryError
+from app.api.auth.services import queue_verification_letter
+from app.api.auth.utils import decode_access_token
+from jinja2 import Environment, FileSystemLoader
+from sqlalchemy import select, delete, update
+from datetime import datetime, timedelta
+from pathlib import Path
+import asyncio
+import httpx
+import re
+import pytest
+
+
+TEMPLATES = Path(__file__).parent.parent / "email_templates"
+
+
+class FailingTransport(MemoryTransport):
+    def __init__(self, error: Exception):
+        super().__init__()
+        self.error = error
+
+    async def send(self, message: dict):
+        raise self.error
+
+
+@pytest.fixture
+def outbox(database_url, monkeypatch):
+    """An empty outbox, the email templates and an in-memory transport; returns a runner for scenarios."""
+    env = Environment(loader=FileSystemLoader(str(TEMPLATES)), autoescape=True)
+    monkeypatch.setitem(templates, "verify", env.get_template("verify.html"))
+    monkeypatch.setattr(services, "transport", MemoryTransport())
+
+    def run(scenario):
+        async def wrapped():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            await apply_migrations(engine)
+
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(EmailOutbox))
+                await db.commit()
+
+            try:
+                return await scenario()
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(wrapped())
+
+    return run
+
+
+async def queue(recipient: str, dedup_key=None) -> bool:
+    async with AsyncSessionLocal() as db:
+        queued = await enqueue_email(db, recipient, "verify", {}, "Subject", dedup_key=dedup_key)
+        await db.commit()
+        return queued
+
+
+async def letters() -> list[EmailOutbox]:
+    async with AsyncSessionLocal() as db:
+        return list((await db.scalars(select(EmailOutbox).order_by(EmailOutbox.id))).all())
+
+
+def test_letter_is_part_of_the_callers_transaction(outbox):
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await enqueue_email(db, "rolled-back@example.com", "verify", {}, "Subject")
+            await db.rollback()
+        return await letters()
+
+    assert outbox(scenario) == []
+
+
+def test_active_letters_are_deduplicated(outbox):
+    async def scenario():
+        first = await queue("dup@example.com", dedup_key="verify:dup@example.com")
+        second = await queue("dup@example.com", dedup_key="verify:dup@example.com")
+        other = await queue("other@example.com", dedup_key="verify:other@example.com")
+
+        # Sent within EMAIL_DEDUP_WINDOW: still skipped, although no longer active.
+        letter = await claim_letter()
+        await finish_letter(letter)
+        recent = await queue(letter.recipient, dedup_key=letter.dedup_key)
+
+        return first, second, other, recent, await letters()
+
+    first, second, other, recent, stored = outbox(scenario)
+
+    assert (first, second, other, recent) == (True, False, True, False)
+    assert sorted(letter.recipient for letter in stored) == ["dup@example.com", "other@example.com"]
+
+
+def test_concurrent_claims_take_distinct_letters(outbox):
+    async def scenario():
+        for number in range(5):
+            await queue(f"claim-{number}@example.com")
+        claimed = await asyncio.gather(*[claim_letter() for _ in range(5)])
+        return claimed, await claim_letter()
+
+    claimed, extra = outbox(scenario)
+
+    assert None not in claimed
+    assert len({letter.id for letter in claimed}) == 5
+    assert all(letter.status == "sending" and letter.attempts == 1 for letter in claimed)
+    # Every letter is leased; nothing is due until a lease expires.
+    assert extra is None
+
+
+def test_expired_lease_is_claimed_again(outbox):
+    async def scenario():
+        await queue("lease@example.com")
+        first = await claim_letter()
+        leased = await claim_letter()
+
+        # The worker died mid-send: once its lease runs out the letter is due again.
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.id == first.id)
+                .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+            )
+            await db.commit()
+
+        return first, leased, await claim_letter()
+
+    first, leased, again = outbox(scenario)
+
+    assert leased is None
+    assert again.id == first.id
+    assert again.attempts == 2
+
+
+def test_failed_delivery_is_retried_with_backoff(outbox, monkeypatch):
+    monkeypatch.setattr(services, "transport", FailingTransport(httpx.ConnectError("unreachable")))
+
+    async def scenario():
+        await queue("retry@example.com")
+        letter = await claim_letter()
+        failed_at = datetime.utcnow()
+        await deliver(letter)
+        return failed_at, (await letters())[0]
+
+    failed_at, letter = outbox(scenario)
+
+    assert letter.status == "pending"
+    assert letter.attempts == 1
+    assert "unreachable" in letter.last_error
+
+    delay = (letter.next_attempt_at - failed_at).total_seconds()
+    assert settings.EMAIL_RETRY_BASE_SECONDS * 0.8 - 1 <= delay <= settings.EMAIL_RETRY_BASE_SECONDS * 1.2 + 1
+
+
+@pytest.mark.parametrize("error, attempts", [
+    (PermanentDeliveryError("422: invalid recipient"), 1),
+    (httpx.ConnectError("unreachable"), settings.EMAIL_MAX_ATTEMPTS),
+])
+def test_permanent_or_exhausted_failures_give_up(outbox, monkeypatch, error, attempts):
+    monkeypatch.setattr(services, "transport", FailingTransport(error))
+
+    async def scenario():
+        await queue("give-up@example.com")
+        async with AsyncSessionLocal() as db:
+            await db.execute(update(EmailOutbox).values(attempts=attempts - 1))
+            await db.commit()
+
+        await deliver(await claim_letter())
+        return (await letters())[0]
+
+    letter = outbox(scenario)
+
+    assert letter.status == "failed"
+    assert letter.attempts == attempts
+
+
+def test_verification_link_is_minted_at_send_time(outbox):
+    email = "verify@example.com"
+
+    async def scenario():
+        async with AsyncSessionLocal() as db:
+            await queue_verification_letter(db, email)
+            await db.commit()
+        queued_at = datetime.utcnow()
+
+        # Tokens carry whole-second expiry times; a token minted now would expire earlier.
+        await asyncio.sleep(1.5)
+        await deliver(await claim_letter())
+
+        return queued_at, (await letters())[0], services.transport.sent
+
+    queued_at, letter, sent = outbox(scenario)
+
+    assert letter.status == "sent"
+    assert "verification_link" not in (letter.template_args or {})
+
+    [message] = sent
+    assert message["to"] == [email]
+
+    token = re.search(r"/auth/verify\?token=([\w.-]+)", message["html"]).group(1)
+    payload = decode_access_token(token)
+    minted_at = datetime.utcfromtimestamp(payload["exp"]) - timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    assert payload["sub"] == email
+    assert minted_at >= queued_at
@@ -0,0 +1,57 @@
+from app.api.telemetry import buffer
+from app.api.telemetry.buffer import SessionBuffer
+from datetime import datetime, timedelta, timezone
+import asyncio
+
+
+class Insert:
+    def values(self, rows):
+        return rows
+
+
+class RecordingSession:
+    """Stands in for AsyncSessionLocal; yields to other tasks while "inserting", like a real round trip."""
+
+    def __init__(self, written: list):
+        self.written = written
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, rows):
+        await asyncio.sleep(0.01)
+        self.written.extend(rows)
+
+    async def commit(self):
+        pass
+
+
+async def nothing(*args):
+    pass
+
+
+def test_concurrent_write_through_writes_every_record_once(monkeypatch):
+    written = []
+    monkeypatch.setattr(buffer, "insert", lambda model: Insert())
+    monkeypatch.setattr(buffer, "AsyncSessionLocal", lambda: RecordingSession(written))
+    monkeypatch.setattr(buffer, "record_activity", nothing)
+    monkeypatch.setattr(buffer, "prune_minute_rollups", nothing)
+
+    # Not started, so every put writes through.
+    session_buffer = SessionBuffer()
+    start = datetime(2026, 3, 10, tzinfo=timezone.utc)
+
+    async def scenario():
+        await asyncio.gather(*[
+            session_buffer.put(start, start + timedelta(minutes=1), "8.8.8.8", "US", user)
+            for user in range(20)
+        ])
+
+    asyncio.run(scenario())
+
+    assert sorted(row["user"] for row in written) == list(range(20))
+    assert session_buffer.pending == []
+    assert session_buffer.written == 20
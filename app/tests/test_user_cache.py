@@ -0,0 +1,75 @@
+from app.api.auth.services import get_user_by_token
+from app.api.auth.utils import create_access_token, user_cache, invalidate_cached_user
+from types import SimpleNamespace
+import asyncio
+
+
+EMAIL = "cached@example.com"
+
+
+class Result:
+    def __init__(self, row):
+        self.row = row
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.row
+
+
+class RacingSession:
+    """Returns the row as it was when read, after `commit_during_read` ran (a concurrent suspension)."""
+
+    def __init__(self, row, commit_during_read=None):
+        self.row = row
+        self.commit_during_read = commit_during_read
+
+    async def execute(self, query):
+        snapshot = SimpleNamespace(**vars(self.row))
+        if self.commit_during_read is not None:
+            hook, self.commit_during_read = self.commit_during_read, None
+            await hook()
+        return Result(snapshot)
+
+
+def make_row() -> SimpleNamespace:
+    return SimpleNamespace(name="Cached", surname="User", email=EMAIL, role="user", id=1, is_suspended=False)
+
+
+def test_suspension_during_lookup_is_not_cached():
+    user_cache.clear()
+    row = make_row()
+    token = create_access_token(data={"sub": EMAIL})
+
+    async def suspend():
+        row.is_suspended = True
+        invalidate_cached_user(EMAIL)
+
+    async def scenario():
+        stale = await get_user_by_token(token, RacingSession(row, commit_during_read=suspend))
+        fresh = await get_user_by_token(token, RacingSession(row))
+        return stale, fresh
+
+    stale, fresh = asyncio.run(scenario())
+
+    assert stale.is_suspended is False
+    assert fresh.is_suspended is True
+
+
+def test_suspend_then_authenticate():
+    user_cache.clear()
+    row = make_row()
+    token = create_access_token(data={"sub": EMAIL})
+
+    async def scenario():
+        before = await get_user_by_token(token, RacingSession(row))
+        row.is_suspended = True
+        invalidate_cached_user(EMAIL)
+        after = await get_user_by_token(token, RacingSession(row))
+        return before, after
+
+    before, after = asyncio.run(scenario())
+
+    assert before.is_suspended is False
+    assert after.is_suspended is True
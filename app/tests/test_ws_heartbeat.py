@@ -0,0 +1,76 @@
+from app.config.environment import settings
+from app.api.telemetry.connections import hold_connection
+from fastapi import FastAPI, WebSocket
+from datetime import datetime, timezone
+import asyncio
+import socket
+import uvicorn
+
+
+PING_INTERVAL = 0.5
+PING_TIMEOUT = 1.0
+
+HANDSHAKE = (
+    "GET /ws HTTP/1.1\r\n"
+    "Host: 127.0.0.1\r\n"
+    "Upgrade: websocket\r\n"
+    "Connection: Upgrade\r\n"
+    "Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+    "Sec-WebSocket-Version: 13\r\n"
+    "\r\n"
+)
+
+
+async def hold_silent_peer() -> tuple[datetime, datetime, datetime]:
+    """
+    Serves one websocket with the worker's protocol (uvicorn's websockets implementation) to a raw
+    client that completes the handshake and then never answers a ping. Returns when the session
+    started, the end hold_connection recorded and when the drop was noticed.
+    """
+    app = FastAPI()
+    result = asyncio.get_running_loop().create_future()
+
+    @app.websocket("/ws")
+    async def endpoint(websocket: WebSocket):
+        await websocket.accept()
+        started_at = datetime.now(timezone.utc)
+        ended_at = await hold_connection(websocket, started_at)
+        result.set_result((started_at, ended_at, datetime.now(timezone.utc)))
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(
+        app, ws="websockets", ws_ping_interval=PING_INTERVAL, ws_ping_timeout=PING_TIMEOUT,
+        lifespan="off", log_level="warning",
+    ))
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+
+        reader, writer = await asyncio.open_connection(*sock.getsockname())
+        writer.write(HANDSHAKE.encode())
+        response = await reader.readuntil(b"\r\n\r\n")
+        assert response.startswith(b"HTTP/1.1 101")
+
+        # Pings pile up unread in the socket buffer; no pong is ever sent.
+        try:
+            return await asyncio.wait_for(result, timeout=PING_INTERVAL + PING_TIMEOUT + 5)
+        finally:
+            writer.close()
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def test_unanswered_protocol_pings_end_the_session_when_the_ping_was_sent(monkeypatch):
+    monkeypatch.setattr(settings, "WS_PROTOCOL_PING_TIMEOUT", PING_TIMEOUT)
+    monkeypatch.setattr(settings, "WS_PING_INTERVAL", 0.0)
+    monkeypatch.setattr(settings, "WS_IDLE_TIMEOUT", 0.0)
+
+    started_at, ended_at, noticed_at = asyncio.run(hold_silent_peer())
+
+    # Noticed one timeout after the first ping, but recorded as ending when that ping went out.
+    assert (noticed_at - started_at).total_seconds() >= PING_INTERVAL + PING_TIMEOUT - 0.1
+    assert abs((ended_at - started_at).total_seconds() - PING_INTERVAL) < 0.3
@@ -0,0 +1,52 @@
+from app.config.environment import settings
+from app.config.database import engine, AsyncSessionLocal
+from app.config.models import User
+from app.api.auth.utils import create_access_token
+from sqlalchemy import select
+from starlette.testclient import TestClient
+from contextlib import ExitStack
+import asyncio
+import httpx
+
+
+EMAIL = "ws-pool@example.com"
+
+
+async def ensure_user():
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(User.id).where(User.email == EMAIL)) is None:
+            db.add(User(
+                name="Pool", surname="Test", email=EMAIL, role="user",
+                hashed_password="-", is_verified=True, is_suspended=False,
+            ))
+            await db.commit()
+
+
+async def request_pages(app, pages: int) -> list[int]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return [
+            (await asyncio.wait_for(client.get(f"/courses/?page={page}&page_size=1"), timeout=5)).status_code
+            for page in range(1, pages + 1)
+        ]
+
+
+def test_http_requests_complete_with_more_sockets_than_pool_connections(database_url):
+    from app.main import app
+
+    sockets = settings.DB_CONNECTION_LIMIT * 3
+    token = create_access_token(data={"sub": EMAIL})
+
+    with TestClient(app) as client:
+        client.portal.call(ensure_user)
+
+        with ExitStack() as stack:
+            for _ in range(sockets):
+                stack.enter_context(client.websocket_connect(f"/telemetry/?token={token}"))
+
+            # Distinct pages miss the course cache, so every request needs a pooled connection.
+            statuses = client.portal.call(request_pages, app, 5)
+
+        client.portal.call(engine.dispose)
+
+    assert statuses == [200] * 5
@@ -0,0 +1,13 @@
+from uvicorn.workers import UvicornWorker
+from app.config.environment import settings
+
+
+class Worker(UvicornWorker):
+    """Gunicorn worker with protocol-level websocket pings from WS_PROTOCOL_PING_INTERVAL/TIMEOUT."""
+
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "ws": "websockets",
+        "ws_ping_interval": settings.WS_PROTOCOL_PING_INTERVAL,
+        "ws_ping_timeout": settings.WS_PROTOCOL_PING_TIMEOUT,
+    }
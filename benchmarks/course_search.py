@@ -0,0 +1,133 @@
+"""
+Course search latency as the catalog grows.
+
+Seeds synthetic courses into a scratch schema of the database given by --database-url
+(the application's .env must still be loadable) and compares the legacy ILIKE filters
+with the full-text `q=` search at each catalog size.
+
+    python -m benchmarks.course_search --database-url postgresql+asyncpg://... --sizes 1000 10000 100000
+"""
+from sqlalchemy import select, insert, text, func
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from app.config.database import Base
+from app.config.models import Course
+from app.config.migrations import apply_migrations
+from app.api.courses.schemas import CourseFilter
+from app.api.courses.utils import build_course_filters, course_search_rank
+from datetime import datetime
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+
+WORDS = [
+    "fintech", "blockchain", "payments", "risk", "compliance", "banking", "crypto", "lending",
+    "insurance", "analytics", "machine", "learning", "regulation", "investment", "portfolio",
+    "digital", "assets", "trading", "credit", "scoring", "fraud", "detection", "open", "api",
+    "фінанси", "платежі", "ризики", "банкінг", "аналітика", "інвестиції", "регулювання", "кредит",
+]
+
+CATEGORIES = ["AI for Fintech", "Digital Finance", "Risk Management", "Payments", "RegTech"]
+
+QUERIES = {
+    "ilike title": CourseFilter(title="fraud"),
+    "ilike description": CourseFilter(description="portfolio"),
+    "q single word": CourseFilter(q="fraud"),
+    "q phrase": CourseFilter(q="fraud detection"),
+    "q ukrainian": CourseFilter(q="ризики"),
+}
+
+
+def random_text(words: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(words))
+
+
+def random_course() -> dict:
+    now = datetime.utcnow()
+    return {
+        "title_ua": random_text(5),
+        "title_en": random_text(5),
+        "description_ua": random_text(120),
+        "description_en": random_text(120),
+        "category": random.choice(CATEGORIES),
+        "tags": random.sample(WORDS, 3),
+        "durationText": f"{random.randint(1, 12)} weeks",
+        "price": round(random.uniform(0, 500), 2),
+        "speaker": random_text(2),
+        "isPublished": True,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+async def seed(engine, total: int):
+    async with AsyncSession(engine) as db:
+        current = await db.scalar(select(func.count()).select_from(Course))
+
+        while current < total:
+            batch = [random_course() for _ in range(min(1000, total - current))]
+            await db.execute(insert(Course), batch)
+            await db.commit()
+            current += len(batch)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE courses"))
+
+
+async def measure(engine, parameters: CourseFilter, repeats: int) -> list[float]:
+    query = select(Course).filter(*build_course_filters(None, parameters))
+    if parameters.q:
+        query = query.order_by(course_search_rank(parameters.q).desc(), Course.id)
+    query = query.limit(parameters.page_size)
+
+    timings = []
+    async with AsyncSession(engine) as db:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = await db.execute(query)
+            result.scalars().all()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    return timings
+
+
+async def main(database_url: str, sizes: list[int], repeats: int, schema: str):
+    admin = create_async_engine(database_url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    await admin.dispose()
+
+    engine = create_async_engine(
+        database_url,
+        connect_args={"server_settings": {"search_path": f"{schema},public"}}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await apply_migrations(engine)
+
+    print(f"{'courses':>8}  {'query':<20} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in sorted(sizes):
+        await seed(engine, size)
+
+        for name, parameters in QUERIES.items():
+            timings = sorted(await measure(engine, parameters, repeats))
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{size:>8}  {name:<20} {statistics.median(timings):>8.2f} {p95:>8.2f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--schema", default="bench_course_search")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.sizes, args.repeats, args.schema))
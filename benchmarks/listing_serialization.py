@@ -0,0 +1,86 @@
+"""
+Serialization cost of one listing page, without the database.
+
+"orm" mirrors the previous path: `CourseView.from_orm` per row, then FastAPI re-validating
+the returned model and encoding it with the standard json module.
+"rows" is the current path: row mappings validated in one TypeAdapter call and encoded by pydantic-core.
+
+    python -m benchmarks.listing_serialization --page-sizes 20 50 100
+"""
+from app.api.courses.schemas import CourseView, PaginationInfo
+from app.api.courses.utils import course_list_adapter, pagination_adapter
+from datetime import datetime
+from types import SimpleNamespace
+import argparse
+import json
+import statistics
+import timeit
+
+
+def make_row(i: int) -> dict:
+    now = datetime.utcnow()
+    return {
+        "id": i,
+        "title_ua": f"Курс {i} з фінансових технологій",
+        "title_en": f"Course {i} on financial technology",
+        "description_ua": "Опис курсу. " * 150,
+        "description_en": "Course description. " * 100,
+        "category": "Digital Finance",
+        "tags": ["fintech", "digital finance", "ai for fintech"],
+        "durationText": "6 weeks",
+        "price": 199.0,
+        "link": f"https://example.com/courses/{i}",
+        "speaker": "Jane Doe",
+        "image": f"https://example.com/images/{i}.png",
+        "isPublished": True,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+def orm_path(objects: list) -> bytes:
+    page = PaginationInfo(
+        courses=[CourseView.from_orm(course) for course in objects],
+        current_page=1,
+        page_size=len(objects),
+        total_courses=1000,
+        total_pages=50,
+    )
+    # What FastAPI does with a returned model: dump, validate against the response model, serialize.
+    validated = PaginationInfo.model_validate(page.model_dump())
+    return json.dumps(validated.model_dump(mode="json")).encode()
+
+
+def rows_path(rows: list) -> bytes:
+    page = PaginationInfo(
+        courses=course_list_adapter.validate_python([dict(row) for row in rows]),
+        current_page=1,
+        page_size=len(rows),
+        total_courses=1000,
+        total_pages=50,
+    )
+    return pagination_adapter.dump_json(page)
+
+
+def main(page_sizes: list[int], repeats: int):
+    print(f"{'page size':>9}  {'orm ms':>8}  {'rows ms':>8}  {'speedup':>7}")
+
+    for size in page_sizes:
+        rows = [make_row(i) for i in range(size)]
+        objects = [SimpleNamespace(**row) for row in rows]
+
+        assert json.loads(orm_path(objects)) == json.loads(rows_path(rows))
+
+        orm = statistics.median(timeit.repeat(lambda: orm_path(objects), number=repeats, repeat=5)) / repeats
+        fast = statistics.median(timeit.repeat(lambda: rows_path(rows), number=repeats, repeat=5)) / repeats
+
+        print(f"{size:>9}  {orm * 1000:>8.3f}  {fast * 1000:>8.3f}  {orm / fast:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[20, 50, 100])
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.page_sizes, args.repeats)
@@ -0,0 +1,139 @@
+"""
+Exact vs approximate (HyperLogLog) distinct-user telemetry: latency and relative error.
+
+Seeds synthetic users and sessions, with their rollups and sketches, into a scratch schema of
+the database given by --database-url (the application's .env must still be loadable), then
+times `/telemetry/numerical` and `/telemetry/distribution` in both modes.
+
+    python -m benchmarks.telemetry_hll --database-url postgresql+asyncpg://... --users 20000 --sessions 200000
+"""
+from sqlalchemy import insert, text
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from app.config.database import Base
+from app.config.models import User, UserSession
+from app.config.migrations import apply_migrations
+from app.api.telemetry.rollups import record_activity
+from app.api.telemetry.partitions import create_partition, month_start, add_months
+from app.api.telemetry.services import compute_numerical_telemetry
+from app.api.telemetry.utils import active_users_distribution
+from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+
+COUNTRIES = ["UA", "PL", "DE", "US", "GB", "FR", "CZ", "NL", "CA", "Unknown"]
+WEIGHTS = [40, 15, 10, 10, 5, 5, 5, 4, 3, 3]
+
+
+def random_session(users: int, days: int) -> dict:
+    now = datetime.now(timezone.utc)
+    start = now - timedelta(seconds=random.uniform(0, days * 86400))
+    end = min(start + timedelta(seconds=random.expovariate(1 / 1200)), now)
+    return {
+        "started_at": start,
+        "period": (start, end),
+        "country": random.choices(COUNTRIES, WEIGHTS)[0],
+        "ip": "127.0.0.1",
+        "user": random.randint(1, users),
+    }
+
+
+async def seed(engine, users: int, sessions: int, days: int):
+    async with AsyncSession(engine) as db:
+        for start in range(0, users, 5000):
+            await db.execute(insert(User), [
+                {
+                    "name": "Bench", "surname": "User", "email": f"bench{i}@example.com",
+                    "role": "user", "hashed_password": "-", "is_verified": True, "is_suspended": False,
+                }
+                for i in range(start + 1, min(start + 5000, users) + 1)
+            ])
+        await db.commit()
+
+        now = datetime.now(timezone.utc)
+        month = month_start(now - timedelta(days=days))
+        while month <= now:
+            await create_partition(db, month)
+            month = add_months(month, 1)
+        await db.commit()
+
+        for start in range(0, sessions, 2000):
+            batch = [random_session(users, days) for _ in range(min(2000, sessions - start))]
+            await db.execute(insert(UserSession).values(batch))
+            await record_activity(db, [(*row["period"], row["user"], row["country"]) for row in batch])
+            await db.commit()
+
+    async with engine.begin() as conn:
+        await conn.execute(text("ANALYZE"))
+
+
+async def timed(engine, repeats: int, call) -> tuple[float, object]:
+    timings = []
+    async with AsyncSession(engine) as db:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = await call(db)
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def relative_errors(exact: dict, approximate: dict) -> list[float]:
+    return [abs(approximate.get(key, 0) - value) / value for key, value in exact.items() if value]
+
+
+async def main(database_url: str, users: int, sessions: int, days: int, repeats: int, schema: str):
+    admin = create_async_engine(database_url)
+    async with admin.begin() as conn:
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+    await admin.dispose()
+
+    engine = create_async_engine(
+        database_url,
+        connect_args={"server_settings": {"search_path": f"{schema},public"}}
+    )
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await apply_migrations(engine)
+
+    started = time.perf_counter()
+    await seed(engine, users, sessions, days)
+    print(f"Seeded {users} users and {sessions} sessions over {days} days in {time.perf_counter() - started:.1f}s\n")
+
+    print(f"{'query':<28} {'exact ms':>9} {'approx ms':>10} {'mean err':>9} {'max err':>8}")
+
+    exact_ms, exact = await timed(engine, repeats, lambda db: compute_numerical_telemetry(db, "exact"))
+    approx_ms, approx = await timed(engine, repeats, lambda db: compute_numerical_telemetry(db, "approximate"))
+    error = abs(approx.active_users - exact.active_users) / max(exact.active_users, 1)
+    print(f"{'30-day active users':<28} {exact_ms:>9.1f} {approx_ms:>10.1f} {error:>8.2%} {error:>8.2%}")
+
+    for since, bucket in [(1, "hour"), (min(days, 31), "hour"), (days, "day")]:
+        exact_ms, exact = await timed(engine, repeats, lambda db: active_users_distribution(db, since, bucket, "exact"))
+        approx_ms, approx = await timed(engine, repeats, lambda db: active_users_distribution(db, since, bucket, "approximate"))
+
+        errors = relative_errors(exact["distribution"], approx["distribution"])
+        errors += relative_errors(exact["countries"], approx["countries"])
+        name = f"distribution {since}d/{bucket}"
+        print(
+            f"{name:<28} {exact_ms:>9.1f} {approx_ms:>10.1f} "
+            f"{statistics.mean(errors) if errors else 0:>8.2%} {max(errors, default=0):>8.2%}"
+        )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--sessions", type=int, default=200000)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--schema", default="bench_telemetry_hll")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.database_url, args.users, args.sessions, args.days, args.repeats, args.schema))
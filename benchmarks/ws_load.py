@@ -0,0 +1,193 @@
+"""
+Telemetry websocket load: accept latency and server memory per open connection.
+
+Opens --connections telemetry websockets against a running server, --concurrency handshakes at
+a time, answers the server's pings (protocol-level, and text "ping" when enabled) while holding them for --hold seconds, then reports
+handshake latency percentiles, rejections (1013 once WS_MAX_CONNECTIONS is reached) and the
+growth of the server's resident memory divided by the connections it holds.
+
+Memory is read from /proc/<pid>/status, so --server-pid must be the worker that accepts the
+sockets (run the server with a single worker). One source address only has about 28k ephemeral
+ports; connections are spread over --source-addresses loopback addresses (127.0.0.1, 127.0.0.2, ...)
+to go beyond that. The open file limit of both processes must exceed --connections.
+
+The token is taken from --token, or minted for --email with the application's SECRET_KEY.
+
+    python -m benchmarks.ws_load --email user@example.com --connections 30000 --server-pid 1234
+"""
+from app.config.environment import settings
+from app.api.auth.utils import create_access_token
+from typing import Optional
+import argparse
+import asyncio
+import resource
+import statistics
+import time
+import websockets
+
+
+def rss_kib(pid: str = "self") -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def raise_file_limit(needed: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = min(hard, max(soft, needed))
+    if target > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    if target < needed:
+        print(f"Warning: open file limit is {target}, below the {needed} descriptors this run needs")
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoadRun:
+    def __init__(self, url: str, source_addresses: int, concurrency: int):
+        self.url = url
+        self.source_addresses = source_addresses
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+        self.connections: list[websockets.ClientConnection] = []
+        self.keepers: list[asyncio.Task] = []
+        self.latencies: list[float] = []
+        self.rejected = 0
+        self.failed = 0
+        self.dropped = 0
+        self.pings = 0
+
+    async def keep_alive(self, connection: websockets.ClientConnection):
+        try:
+            async for message in connection:
+                if message == "ping":
+                    self.pings += 1
+                    await connection.send("pong")
+        except websockets.ConnectionClosed:
+            pass
+        self.dropped += 1
+
+    async def open(self, index: int):
+        source = f"127.0.0.{index % self.source_addresses + 1}"
+
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                connection = await websockets.connect(
+                    self.url,
+                    local_addr=(source, 0),
+                    # Heartbeats are the server's job here; client pings would only add load.
+                    ping_interval=None,
+                    open_timeout=30,
+                )
+            except Exception as e:
+                self.failed += 1
+                if self.failed <= 5:
+                    print(f"Connection {index} failed: {type(e).__name__}: {e}")
+                return
+
+            latency = time.perf_counter() - started
+
+        # Rejected and unauthorized sockets are closed right after the handshake.
+        try:
+            await asyncio.wait_for(connection.wait_closed(), timeout=0.2)
+        except asyncio.TimeoutError:
+            pass
+
+        if connection.close_code is not None:
+            if connection.close_code == 1013:
+                self.rejected += 1
+            else:
+                self.failed += 1
+                if self.failed <= 5:
+                    print(f"Connection {index} closed: {connection.close_code} {connection.close_reason}")
+            return
+
+        self.latencies.append(latency)
+        self.connections.append(connection)
+        self.keepers.append(asyncio.create_task(self.keep_alive(connection)))
+
+    async def close(self):
+        await asyncio.gather(*[connection.close() for connection in self.connections], return_exceptions=True)
+        await asyncio.gather(*self.keepers, return_exceptions=True)
+
+
+async def main(
+    base_url: str, token: str, connections: int, concurrency: int, hold: float,
+    server_pid: Optional[int], source_addresses: int
+):
+    raise_file_limit(connections + 1024)
+
+    url = base_url.replace("http", "ws", 1).rstrip("/") + f"/telemetry/?token={token}"
+    run = LoadRun(url, source_addresses, concurrency)
+
+    baseline = rss_kib(str(server_pid)) if server_pid else None
+    client_baseline = rss_kib()
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*[run.open(i) for i in range(connections)])
+        elapsed = time.perf_counter() - started
+
+        open_connections = len(run.connections)
+        print(
+            f"Opened {open_connections}/{connections} websockets in {elapsed:.1f}s "
+            f"({open_connections / elapsed:.0f}/s), {run.rejected} rejected with 1013, {run.failed} failed"
+        )
+
+        if run.latencies:
+            latencies = [latency * 1000 for latency in run.latencies]
+            print(
+                f"Accept latency: median {statistics.median(latencies):.1f} ms, "
+                f"p95 {percentile(latencies, 0.95):.1f} ms, p99 {percentile(latencies, 0.99):.1f} ms, "
+                f"max {max(latencies):.1f} ms"
+            )
+
+        print(f"Holding for {hold:.0f}s (protocol pings every {settings.WS_PROTOCOL_PING_INTERVAL:.0f}s)")
+        await asyncio.sleep(hold)
+
+        held = len(run.connections) - run.dropped
+        print(f"{held} still open after holding, {run.pings} pings answered")
+
+        if baseline is not None and held:
+            grown = rss_kib(str(server_pid)) - baseline
+            print(f"Server RSS grew by {grown / 1024:.1f} MiB: {grown / held:.1f} KiB per connection")
+        elif server_pid:
+            print(f"Could not read the memory of process {server_pid}")
+
+        client_grown = rss_kib() - client_baseline
+        if held:
+            print(f"Client RSS grew by {client_grown / 1024:.1f} MiB: {client_grown / held:.1f} KiB per connection")
+    finally:
+        await run.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--token")
+    parser.add_argument("--email")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--hold", type=float, default=settings.WS_PROTOCOL_PING_INTERVAL + settings.WS_PROTOCOL_PING_TIMEOUT + 5)
+    parser.add_argument("--server-pid", type=int)
+    parser.add_argument("--source-addresses", type=int, default=4)
+    args = parser.parse_args()
+
+    if not args.token and not args.email:
+        parser.error("either --token or --email is required")
+
+    token = args.token or create_access_token(data={"sub": args.email})
+
+    asyncio.run(main(
+        args.base_url, token, args.connections, args.concurrency, args.hold,
+        args.server_pid, args.source_addresses
+    ))
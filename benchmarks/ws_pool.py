@@ -0,0 +1,87 @@
+"""
+HTTP availability while more telemetry websockets are open than the database pool has connections.
+
+Opens --sockets telemetry connections (default: three times DB_CONNECTION_LIMIT) against a
+running server, keeps them open, then issues --requests HTTP requests to --path and fails if
+any of them errors or takes longer than --timeout. A websocket holding a pooled connection for
+its lifetime makes the requests hang once the pool is exhausted. `{i}` in --path is replaced by
+the request number so that every request misses the in-process caches and reaches the database.
+
+The token is taken from --token, or minted for --email with the application's SECRET_KEY.
+
+    python -m benchmarks.ws_pool --base-url http://localhost:8000 --email user@example.com
+"""
+from app.config.environment import settings
+from app.api.auth.utils import create_access_token
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import httpx
+import websockets
+
+
+async def open_socket(url: str) -> websockets.ClientConnection:
+    connection = await websockets.connect(url)
+    # Invalid tokens and failed lookups close the socket right after accepting it.
+    try:
+        await asyncio.wait_for(connection.recv(), timeout=0.5)
+    except asyncio.TimeoutError:
+        return connection
+    except websockets.ConnectionClosed as e:
+        raise RuntimeError(f"Server closed the socket: {e.rcvd.reason if e.rcvd else e}")
+    return connection
+
+
+async def main(base_url: str, token: str, sockets: int, requests: int, path: str, timeout: float) -> bool:
+    ws_url = base_url.replace("http", "ws", 1).rstrip("/") + f"/telemetry/?token={token}"
+
+    connections = []
+    try:
+        for _ in range(sockets):
+            connections.append(await open_socket(ws_url))
+        print(f"Opened {len(connections)} websockets (pool size {settings.DB_CONNECTION_LIMIT})")
+
+        latencies = []
+        failures = 0
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+            for i in range(1, requests + 1):
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path.format(i=i))
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError as e:
+                    failures += 1
+                    print(f"Request failed: {type(e).__name__}: {e}")
+
+        if latencies:
+            print(
+                f"{len(latencies)}/{requests} requests to {path} succeeded, "
+                f"median {statistics.median(latencies) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms"
+            )
+
+        return failures == 0
+    finally:
+        await asyncio.gather(*[connection.close() for connection in connections], return_exceptions=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--token")
+    parser.add_argument("--email")
+    parser.add_argument("--sockets", type=int, default=settings.DB_CONNECTION_LIMIT * 3)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--path", default="/courses/?page={i}&page_size=1")
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    if not args.token and not args.email:
+        parser.error("either --token or --email is required")
+
+    token = args.token or create_access_token(data={"sub": args.email})
+
+    ok = asyncio.run(main(args.base_url, token, args.sockets, args.requests, args.path, args.timeout))
+    sys.exit(0 if ok else 1)